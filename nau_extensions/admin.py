@@ -1,59 +1,293 @@
+import logging
+from datetime import timedelta
+from itertools import repeat
 from pprint import pformat
 
+from django.conf import settings
 from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
-from nau_extensions.financial_manager import \
-    send_to_financial_manager_if_enabled
+from nau_extensions.financial_manager import (
+    is_financial_manager_enabled, is_financial_manager_outbox_enabled,
+    send_to_financial_manager_if_enabled, sync_request_data_bulk)
 from nau_extensions.models import (BasketBillingInformation,
-                                   BasketTransactionIntegration)
+                                   BasketTransactionIntegration,
+                                   BasketTransactionIntegrationArchive,
+                                   BasketTransactionIntegrationAttempt)
+from nau_extensions.utils import DatabaseThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
 
 admin.site.register(BasketBillingInformation)
 
 
+def _format_payload(payload):
+    """
+    Pretty print a JSON payload, the very large ones are truncated and collapsed.
+    """
+    pretty_payload = pformat(payload)
+    max_length = getattr(settings, "NAU_ADMIN_PAYLOAD_MAX_LENGTH", 10000)
+
+    # Use format_html() to escape user-provided inputs, avoiding an XSS vulnerability.
+    if len(pretty_payload) <= max_length:
+        return format_html('<br><br><pre>{}</pre>', pretty_payload)
+    return format_html(
+        '<br><br><details><summary>{} ({}/{})</summary><pre>{}</pre></details>',
+        _("Truncated"),
+        max_length,
+        len(pretty_payload),
+        pretty_payload[:max_length],
+    )
+
+
+class BasketTransactionIntegrationAttemptInline(admin.TabularInline):
+    model = BasketTransactionIntegrationAttempt
+    fields = ('created', 'request_build_duration_ms', 'http_duration_ms', 'status_code', 'error_class')
+    readonly_fields = fields
+    ordering = ('-id',)
+    extra = 0
+    max_num = 0
+    can_delete = False
+
+
 @admin.register(BasketTransactionIntegration)
 class BasketTransactionIntegrationAdmin(admin.ModelAdmin):
     list_filter = ('state',)
-    search_fields = ('basket', 'state',)
-    list_display = ('basket', 'state', 'created', 'modified')
-    fields = ('basket', 'state', 'created', 'modified', 'formatted_request', 'formatted_response')
-    readonly_fields = ('basket', 'state', 'created', 'modified', 'formatted_request', 'formatted_response')
+    search_fields = ('=basket__id', '=basket__order__number', '=basket__owner__email')
+    list_display = ('id', 'basket_id', 'order_number', 'email', 'state', 'created', 'modified')
+    list_select_related = ('basket__owner', 'basket__site__siteconfiguration__partner')
+    fields = (
+        'basket', 'state', 'created', 'modified', 'attempt_count', 'last_attempt_at', 'next_attempt_at',
+        'receipt_link', 'receipt_link_fetched_at', 'response_status_code', 'response_transaction_id',
+        'response_error_fields', 'response_receipt_reference', 'formatted_request', 'formatted_response',
+    )
+    readonly_fields = fields
+    inlines = (BasketTransactionIntegrationAttemptInline,)
     show_full_result_count = False
 
-    def formatted_request(self, obj):
-        pretty_response = pformat(obj.request)
+    def get_queryset(self, request):
+        """
+        Don't load the request and response payloads on the changelist, they aren't displayed.
+        """
+        queryset = super().get_queryset(request)
+        # the request may not have been resolved or its url may not have a name
+        url_name = getattr(getattr(request, "resolver_match", None), "url_name", None) or ""
+        if url_name.endswith("_changelist"):
+            queryset = queryset.defer("request", "response", "response_body")
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search by the exact basket id, email or order number, so the indexes are used
+        instead of scanning the whole table.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            query = Q(basket_id=int(search_term))
+        elif "@" in search_term:
+            query = Q(basket__owner__email=search_term)
+        else:
+            query = Q(basket__order__number=search_term)
+        return queryset.filter(query), False
 
-        # Use format_html() to escape user-provided inputs, avoiding an XSS vulnerability.
-        return format_html('<br><br><pre>{}</pre>', pretty_response)
+    def order_number(self, obj):
+        return obj.basket.order_number if obj.basket else None
 
-    def formatted_response(self, obj):
-        pretty_response = pformat(obj.response)
+    def email(self, obj):
+        return obj.basket.owner.email if obj.basket and obj.basket.owner else None
 
-        # Use format_html() to escape user-provided inputs, avoiding an XSS vulnerability.
-        return format_html('<br><br><pre>{}</pre>', pretty_response)
+    def formatted_request(self, obj):
+        return _format_payload(obj.request)
+
+    def formatted_response(self, obj):
+        return _format_payload(obj.response_data)
 
     @admin.action(description=_("Retry Send to Financial Manager System"))
     def retry_send_to_financial_manager(self, request, queryset):
         """
         Django admin action that permit to retry send information to financial manager.
+        The objects already sent with success are skipped. When the outbox mode is enabled,
+        the large selections are enqueued to the outbox worker, otherwise the request data of
+        the objects is synchronized in bulk and then they are sent concurrently.
         """
-        for bti in queryset:
-            sent = send_to_financial_manager_if_enabled(bti)
-            if sent:
-                self.message_user(
-                    request,
-                    _(
-                        "Retry Send to Financial Manager System with success.",
-                    ),
-                    messages.SUCCESS,
-                )
-            else:
-                self.message_user(
-                    request,
-                    _(
-                        "Retry Send to Financial Manager System with an error.",
-                    ),
-                    messages.ERROR,
+        skipped_count = queryset.filter(state=BasketTransactionIntegration.SENT_WITH_SUCCESS).count()
+        queryset = queryset.exclude(state=BasketTransactionIntegration.SENT_WITH_SUCCESS)
+
+        enqueue_threshold = getattr(settings, "NAU_ADMIN_RETRY_ENQUEUE_THRESHOLD", 20)
+        if is_financial_manager_outbox_enabled() and queryset.count() > enqueue_threshold:
+            enqueued_count = queryset.update(
+                state=BasketTransactionIntegration.TO_BE_SENT,
+                next_attempt_at=None,
+                modified=timezone.now(),
+            )
+            self.message_user(
+                request,
+                _("Enqueued %(enqueued)d, skipped %(skipped)d already sent.") % {
+                    "enqueued": enqueued_count,
+                    "skipped": skipped_count,
+                },
+                messages.SUCCESS,
+            )
+            return
+
+        btis = list(
+            queryset.select_related(
+                "basket__owner", "basket__site__siteconfiguration__partner"
+            ).defer(None)
+        )
+        sent_count = 0
+        if btis:
+            workers = min(getattr(settings, "NAU_ADMIN_RETRY_WORKERS", 4), len(btis))
+            with DatabaseThreadPoolExecutor(max_workers=workers) as executor:
+                synchronized = executor.submit(self._sync_requests, btis).result()
+                sent_count = sum(executor.map(self._retry_send, btis, repeat(not synchronized)))
+        failed_count = len(btis) - sent_count
+        self.message_user(
+            request,
+            _("Sent %(sent)d, failed %(failed)d, skipped %(skipped)d already sent.") % {
+                "sent": sent_count,
+                "failed": failed_count,
+                "skipped": skipped_count,
+            },
+            messages.ERROR if failed_count else messages.SUCCESS,
+        )
+
+    def _sync_requests(self, btis) -> bool:
+        """
+        Synchronize the request data of the objects in bulk, on a worker thread and on its own
+        short transaction, so the admin request transaction doesn't lock the rows that the
+        worker threads update when sending them.
+        Returns `False` if it has failed, so each object is synchronized when it's sent.
+        """
+        try:
+            with transaction.atomic():
+                sync_request_data_bulk(
+                    [bti for bti in btis if bti.basket_id and is_financial_manager_enabled(bti.basket.site)]
                 )
+            return True
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception("Error synchronizing the requests in bulk [%s]", e)
+            return False
+
+    def _retry_send(self, bti, sync_request) -> bool:
+        """
+        Send a single object on a worker thread.
+        """
+        try:
+            return bool(send_to_financial_manager_if_enabled(bti, sync_request=sync_request))
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception("Error sending basket_id=%s [%s]", bti.basket_id, e)
+            return False
 
     actions = [retry_send_to_financial_manager]
+
+
+@admin.register(BasketTransactionIntegrationAttempt)
+class BasketTransactionIntegrationAttemptAdmin(admin.ModelAdmin):
+    """
+    The append-only log of the attempts, with the latency percentiles of each partner.
+    """
+    change_list_template = "nau_extensions/admin/attempt_change_list.html"
+    list_filter = ('partner', 'status_code', 'error_class')
+    list_display = (
+        'id', 'integration_id', 'partner', 'created', 'request_build_duration_ms',
+        'http_duration_ms', 'status_code', 'error_class',
+    )
+    show_full_result_count = False
+    window_hours_choices = (1, 24, 7 * 24, 30 * 24)
+    max_window_hours = 30 * 24
+    percentiles = (50, 95, 99)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_window_hours(self, request) -> int:
+        """
+        The `window_hours` parameter, limited to `max_window_hours` so the percentiles queries
+        stay bounded, or 24 if it isn't an integer.
+        """
+        try:
+            window_hours = int(request.GET.get("window_hours", 24))
+        except ValueError:
+            return 24
+        return min(max(window_hours, 1), self.max_window_hours)
+
+    def changelist_view(self, request, extra_context=None):
+        """
+        Add the latency percentiles of the window chosen with the `window_hours` parameter.
+        """
+        window_hours = self.get_window_hours(request)
+        if "window_hours" in request.GET:
+            # it isn't a field lookup, remove it so the changelist doesn't reject it
+            request.GET = request.GET.copy()
+            del request.GET["window_hours"]
+        extra_context = {
+            **(extra_context or {}),
+            "window_hours": window_hours,
+            "window_hours_choices": self.window_hours_choices,
+            "percentiles": self.percentiles,
+            "latency_percentiles": BasketTransactionIntegrationAttempt.get_latency_percentiles(
+                timezone.now() - timedelta(hours=window_hours), self.percentiles
+            ),
+        }
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+@admin.register(BasketTransactionIntegrationArchive)
+class BasketTransactionIntegrationArchiveAdmin(admin.ModelAdmin):
+    """
+    The archived objects sent with success, searchable by the exact basket id or order number.
+    """
+    list_filter = ('partner',)
+    search_fields = ('=basket_id', '=order_number')
+    list_display = ('id', 'basket_id', 'order_number', 'partner', 'state', 'created', 'archived')
+    fields = (
+        'id', 'basket_id', 'order_number', 'partner', 'state', 'created', 'modified', 'attempt_count',
+        'last_attempt_at', 'receipt_link', 'receipt_link_fetched_at', 'response_status_code',
+        'response_transaction_id', 'response_receipt_reference', 'archived', 'formatted_request',
+        'formatted_response',
+    )
+    readonly_fields = fields
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """
+        Don't load the request and response payloads on the changelist, they aren't displayed.
+        """
+        queryset = super().get_queryset(request)
+        # the request may not have been resolved or its url may not have a name
+        url_name = getattr(getattr(request, "resolver_match", None), "url_name", None) or ""
+        if url_name.endswith("_changelist"):
+            queryset = queryset.defer("request", "response")
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search by the exact basket id or order number, so the indexes are used.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(basket_id=int(search_term)), False
+        return queryset.filter(order_number=search_term), False
+
+    def formatted_request(self, obj):
+        return _format_payload(obj.request)
+
+    def formatted_response(self, obj):
+        return _format_payload(obj.response)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
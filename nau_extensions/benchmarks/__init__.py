@@ -0,0 +1,7 @@
+"""
+Benchmarks of the NAU extensions hot paths.
+
+The benchmarks are Django test cases on files named `bench_*.py`, so they aren't collected with
+the tests. Run them with `make benchmark`, the results are saved as JSON and can be compared
+between runs with `python -m nau_extensions.benchmarks.compare`.
+"""
@@ -0,0 +1,135 @@
+"""
+Load test of the checkout, to measure the overhead of the integration with the
+nau-financial-manager on the `post_checkout` signal.
+
+The same number of realistic orders is checked out concurrently on each mode:
+- `disconnected` without the receiver of the integration, the baseline;
+- `disabled` without the `NAU_FINANCIAL_MANAGER` setting of the partner;
+- `outbox` with the `NAU_FINANCIAL_MANAGER_OUTBOX` setting;
+- `enabled` sending to a stand-in of the nau-financial-manager.
+
+Environment variables:
+- `NAU_BENCHMARK_CHECKOUTS` number of checkouts of each mode, default 50;
+- `NAU_BENCHMARK_CONCURRENCY` number of concurrent checkouts, default 1 because SQLite
+  doesn't support concurrent writes, use a higher value with a MySQL test database;
+- `NAU_BENCHMARK_FM_LATENCY` mean latency in seconds of the stand-in, default 0.05;
+- `NAU_BENCHMARK_FM_ERROR_RATE` fraction of errors of the stand-in, default 0.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.test import override_settings
+from nau_extensions.benchmarks.utils import (TransactionBenchmarkTestCase,
+                                             record)
+from nau_extensions.financial_manager_stub import FinancialManagerStubServer
+from nau_extensions.models import BasketBillingInformation
+from nau_extensions.signals import (
+    create_and_send_basket_transaction_integration_to_financial_manager,
+    post_checkout)
+from nau_extensions.tests.factories import create_order_with_lines
+from nau_extensions.utils import DatabaseThreadPoolExecutor
+from oscar.test.factories import CountryFactory
+
+from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.tests.factories import (PartnerFactory,
+                                       SiteConfigurationFactory, UserFactory)
+
+CHECKOUTS = int(os.environ.get("NAU_BENCHMARK_CHECKOUTS", 50))
+CONCURRENCY = int(os.environ.get("NAU_BENCHMARK_CONCURRENCY", 1))
+FM_LATENCY = float(os.environ.get("NAU_BENCHMARK_FM_LATENCY", 0.05))
+FM_ERROR_RATE = float(os.environ.get("NAU_BENCHMARK_FM_ERROR_RATE", 0))
+
+DISPATCH_UID = "create_and_send_basket_transaction_integration_to_financial_manager"
+
+
+class CheckoutBenchmark(TransactionBenchmarkTestCase):
+    """
+    Measure the latency percentiles of the `post_checkout` signal on each mode.
+    """
+
+    def setUp(self):
+        super().setUp()
+        partner = PartnerFactory(short_code="edX")
+        self.site = SiteConfigurationFactory(partner=partner).site
+        self.course = CourseFactory(
+            id="course-v1:edX+DemoX+Demo_Course",
+            name="edX Demonstration Course",
+            partner=partner,
+        )
+        self.country = CountryFactory(iso_3166_1_a2="PT", printable_name="Portugal")
+
+    def _create_orders(self):
+        orders = []
+        for index in range(CHECKOUTS):
+            # most of the orders have a single seat
+            order = create_order_with_lines(
+                1 if index % 10 else 3, owner=UserFactory(), site=self.site, course=self.course
+            )
+            BasketBillingInformation.objects.create(
+                basket=order.basket,
+                first_name="Fundação",
+                line1="Av. do Brasil n.º 101",
+                line4="Lisboa",
+                country=self.country,
+                vatin="123456789",
+            )
+            orders.append(order)
+        return orders
+
+    @contextmanager
+    def _mode(self, mode, server):
+        financial_manager = {
+            "edx": {
+                "url": server.transaction_url,
+                "receipt-link-url": server.receipt_link_url,
+                "token": "a-very-long-token",
+            },
+        }
+        if mode == "disconnected":
+            post_checkout.disconnect(dispatch_uid=DISPATCH_UID)
+            try:
+                yield
+            finally:
+                post_checkout.connect(
+                    create_and_send_basket_transaction_integration_to_financial_manager,
+                    dispatch_uid=DISPATCH_UID,
+                )
+        elif mode == "disabled":
+            with override_settings(NAU_FINANCIAL_MANAGER={}):
+                yield
+        elif mode == "outbox":
+            with override_settings(
+                NAU_FINANCIAL_MANAGER=financial_manager, NAU_FINANCIAL_MANAGER_OUTBOX=True
+            ):
+                yield
+        else:
+            with override_settings(
+                NAU_FINANCIAL_MANAGER=financial_manager,
+                NAU_FINANCIAL_MANAGER_RECEIPT_LINK_PREFETCH=False,
+            ):
+                yield
+
+    def _checkout(self, order):
+        """
+        Send the `post_checkout` signal inside a transaction, like the checkout does.
+        Returns its duration.
+        """
+        start = time.perf_counter()
+        with transaction.atomic():
+            post_checkout.send(sender=self, order=order, request=None)
+        return time.perf_counter() - start
+
+    def test_post_checkout(self):
+        with FinancialManagerStubServer(
+            latency_distribution="exponential",
+            latency_mean=FM_LATENCY,
+            error_rate=FM_ERROR_RATE,
+            seed=1,
+        ) as server:
+            for mode in ("disconnected", "disabled", "outbox", "enabled"):
+                orders = self._create_orders()
+                with self._mode(mode, server), DatabaseThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+                    timings = list(executor.map(self._checkout, orders))
+                record(f"post_checkout[{mode},concurrency={CONCURRENCY}]", timings)
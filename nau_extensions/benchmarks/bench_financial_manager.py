@@ -0,0 +1,87 @@
+"""
+Benchmarks of building the request data sent to the nau-financial-manager.
+"""
+from django.db.models.signals import pre_save
+from nau_extensions.benchmarks.utils import BenchmarkTestCase
+from nau_extensions.financial_manager import (_convert_order_lines,
+                                              sync_request_data)
+from nau_extensions.models import (BasketBillingInformation,
+                                   BasketTransactionIntegration)
+from nau_extensions.signals import change_product_titles
+from nau_extensions.tests.factories import create_order_with_lines
+from oscar.core.loading import get_model
+from oscar.test.factories import CountryFactory
+
+from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.tests.factories import (PartnerFactory,
+                                       SiteConfigurationFactory, UserFactory)
+
+Order = get_model("order", "Order")
+Product = get_model("catalogue", "Product")
+
+NUMBER_OF_LINES = (1, 10, 100)
+
+
+class FinancialManagerBenchmark(BenchmarkTestCase):
+    """
+    Benchmark the request data of orders of increasing size.
+    """
+
+    def setUp(self):
+        super().setUp()
+        partner = PartnerFactory(short_code="edX")
+        self.site = SiteConfigurationFactory(partner=partner).site
+        self.course = CourseFactory(
+            id="course-v1:edX+DemoX+Demo_Course",
+            name="edX Demonstration Course",
+            partner=partner,
+        )
+        self.country = CountryFactory(iso_3166_1_a2="PT", printable_name="Portugal")
+
+    def _create_order(self, number_of_lines):
+        order = create_order_with_lines(
+            number_of_lines, owner=UserFactory(), site=self.site, course=self.course
+        )
+        BasketBillingInformation.objects.create(
+            basket=order.basket,
+            first_name="Fundação",
+            line1="Av. do Brasil n.º 101",
+            line4="Lisboa",
+            country=self.country,
+            vatin="123456789",
+        )
+        return order
+
+    def test_sync_request_data(self):
+        for number_of_lines in NUMBER_OF_LINES:
+            bti = BasketTransactionIntegration.create(self._create_order(number_of_lines).basket)
+            bti.save()
+            self.benchmark(
+                f"sync_request_data[lines={number_of_lines}]",
+                sync_request_data,
+                setup=lambda bti_id=bti.id: BasketTransactionIntegration.objects.get(id=bti_id),
+            )
+
+    def test_convert_order_lines(self):
+        for number_of_lines in NUMBER_OF_LINES:
+            order = self._create_order(number_of_lines)
+            self.benchmark(
+                f"_convert_order_lines[lines={number_of_lines}]",
+                _convert_order_lines,
+                setup=lambda order_id=order.id: Order.objects.get(id=order_id),
+            )
+
+    def test_change_product_titles(self):
+        def new_product():
+            return Product(title="Seat in edX Demonstration Course with verified certificate")
+
+        self.benchmark(
+            "change_product_titles",
+            lambda product: change_product_titles(Product, product),
+            setup=new_product,
+        )
+        self.benchmark(
+            "change_product_titles[pre_save]",
+            lambda product: pre_save.send(sender=Product, instance=product),
+            setup=new_product,
+        )
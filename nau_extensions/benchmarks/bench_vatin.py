@@ -0,0 +1,64 @@
+"""
+Benchmarks of the VATIN validation.
+"""
+from nau_extensions.benchmarks.utils import BenchmarkTestCase
+from nau_extensions.nif import controlNIF
+from nau_extensions.vatin import check_country_vatin
+
+# a valid VATIN of each country with a specific validation
+VATIN_SAMPLES = {
+    "AT": "U12345678",
+    "BE": "0123456789",
+    "BG": "123456789",
+    "CY": "12345678L",
+    "CZ": "12345678",
+    "DE": "123456789",
+    "DK": "12345678",
+    "EE": "123456789",
+    "EL": "123456789",
+    "ES": "B34562534",
+    "FI": "12345678",
+    "FR": "12345678901",
+    "GB": "123456789",
+    "HU": "12345678",
+    "IE": "1S12345L",
+    "IT": "12345678901",
+    "LT": "123456789",
+    "LU": "12345678",
+    "LV": "12345678901",
+    "MT": "12345678",
+    "NL": "123456789B01",
+    "PL": "1234567890",
+    "PT": "600021505",
+    "RO": "1234567890",
+    "SE": "123456789012",
+    "SI": "12345678",
+    "SK": "1234567890",
+    # a country without a specific validation
+    "US": "123456789",
+}
+
+# the number of calls timed together, because a single call is too fast to be timed
+CALLS = 1000
+
+
+class VATINBenchmark(BenchmarkTestCase):
+    """
+    Benchmark the VATIN validation of each country.
+    """
+
+    def test_check_country_vatin(self):
+        for country, vatin in VATIN_SAMPLES.items():
+            self.assertTrue(check_country_vatin(country, vatin))
+            self.benchmark(
+                f"check_country_vatin[{country}]x{CALLS}",
+                lambda country=country, vatin=vatin: [
+                    check_country_vatin(country, vatin) for _ in range(CALLS)
+                ],
+            )
+
+    def test_control_nif(self):
+        self.benchmark(
+            f"controlNIF x{CALLS}",
+            lambda: [controlNIF("600021505") for _ in range(CALLS)],
+        )
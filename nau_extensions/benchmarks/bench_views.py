@@ -0,0 +1,52 @@
+"""
+Benchmarks of the billing information views.
+"""
+from django.test import RequestFactory
+from nau_extensions.benchmarks.utils import BenchmarkTestCase
+from nau_extensions.models import BasketBillingInformation
+from nau_extensions.tests.factories import (create_basket,
+                                            create_order_with_lines)
+from nau_extensions.views import (
+    BasketBillingInformationAddressCreateUpdateView,
+    BasketBillingInformationVATINCreateUpdateView)
+from oscar.test.factories import CountryFactory
+
+from ecommerce.tests.factories import SiteConfigurationFactory, UserFactory
+
+
+class BillingViewsBenchmark(BenchmarkTestCase):
+    """
+    Benchmark the `get_initial` of the billing information views, that copies the billing
+    information of the previous basket of the same owner.
+    """
+
+    def test_get_initial(self):
+        site = SiteConfigurationFactory().site
+        owner = UserFactory()
+        order = create_order_with_lines(1, owner=owner, site=site)
+        BasketBillingInformation.objects.create(
+            basket=order.basket,
+            first_name="Fundação",
+            line1="Av. do Brasil n.º 101",
+            line4="Lisboa",
+            country=CountryFactory(iso_3166_1_a2="PT", printable_name="Portugal"),
+            vatin="123456789",
+        )
+        basket = create_basket(owner=owner, site=site)
+
+        for view_class in (
+            BasketBillingInformationAddressCreateUpdateView,
+            BasketBillingInformationVATINCreateUpdateView,
+        ):
+            def new_view(view_class=view_class):
+                view = view_class()
+                view.request = RequestFactory().get("/")
+                view.kwargs = {}
+                view.basket = basket
+                return view
+
+            self.benchmark(
+                f"{view_class.__name__}.get_initial",
+                lambda view: view.get_initial(),
+                setup=new_view,
+            )
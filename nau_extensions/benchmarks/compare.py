@@ -0,0 +1,55 @@
+"""
+Compare the results of two benchmark runs.
+
+Example:
+  python -m nau_extensions.benchmarks.compare before.json after.json --threshold=0.2
+
+Exits with an error when the median of any benchmark is slower than the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(before, after, threshold) -> list:
+    """
+    Compare the medians of the benchmarks of both runs, returns the regressions.
+    """
+    regressions = []
+    for name in sorted(set(before["benchmarks"]) | set(after["benchmarks"])):
+        if name not in before["benchmarks"] or name not in after["benchmarks"]:
+            print(f"{name:<60} only on {'after' if name in after['benchmarks'] else 'before'}")
+            continue
+        before_median = before["benchmarks"][name]["median"]
+        after_median = after["benchmarks"][name]["median"]
+        ratio = after_median / before_median if before_median else 1
+        regression = ratio > 1 + threshold
+        print(
+            f"{name:<60} {before_median * 1000:10.3f}ms {after_median * 1000:10.3f}ms "
+            f"{ratio:6.2f}x{' REGRESSION' if regression else ''}"
+        )
+        if regression:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("before", help="JSON results of the previous run")
+    parser.add_argument("after", help="JSON results of the current run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Maximum accepted slowdown of the median, 0.2 is 20%% slower",
+    )
+    args = parser.parse_args(argv)
+    with open(args.before, encoding="utf-8") as before, open(args.after, encoding="utf-8") as after:
+        regressions = compare(json.load(before), json.load(after), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmarks are slower than the threshold")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Utilities to time the benchmarks and save their results as JSON.
+"""
+import json
+import math
+import os
+import platform
+import statistics
+import time
+
+import django
+from django.db import connection
+from django.utils import timezone
+
+from ecommerce.tests.testcases import TestCase, TransactionTestCase
+
+# the results of all the benchmarks run on this process
+_results = {}
+
+
+def get_benchmark_output() -> str:
+    """
+    The path of the JSON file where the results are saved.
+    """
+    return os.environ.get("NAU_BENCHMARK_OUTPUT", "benchmark.json")
+
+
+def record(name, timings):
+    """
+    Record the statistics of the `timings` in seconds of the benchmark `name`.
+    """
+    timings = sorted(timings)
+    _results[name] = {
+        "repeat": len(timings),
+        "min": timings[0],
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "p95": _percentile(timings, 95),
+        "p99": _percentile(timings, 99),
+        "max": timings[-1],
+    }
+
+
+def _percentile(sorted_timings, percentile):
+    # the nearest-rank percentile
+    return sorted_timings[max(math.ceil(len(sorted_timings) * percentile / 100) - 1, 0)]
+
+
+def save():
+    """
+    Save the results of all the benchmarks run on this process.
+    """
+    with open(get_benchmark_output(), "w", encoding="utf-8") as output:
+        json.dump(
+            {
+                "created": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "unit": "seconds",
+                "benchmarks": dict(sorted(_results.items())),
+            },
+            output,
+            indent=2,
+        )
+
+
+class BenchmarkMixin:
+    """
+    Time the benchmarks, the results are saved after each class.
+    The number of repetitions of each benchmark can be changed with the
+    `NAU_BENCHMARK_REPEAT` environment variable.
+    """
+
+    repeat = int(os.environ.get("NAU_BENCHMARK_REPEAT", 20))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        save()
+
+    def benchmark(self, name, function, *args, setup=None, repeat=None):
+        """
+        Time `repeat` calls of `function` with `args`, excluding the optional `setup` function
+        that is called before each call and whose result is appended to the `args`.
+        Returns the result of the last call.
+        """
+        timings = []
+        result = None
+        for _ in range(repeat or self.repeat):
+            call_args = args + (setup(),) if setup else args
+            start = time.perf_counter()
+            result = function(*call_args)
+            timings.append(time.perf_counter() - start)
+        record(name, timings)
+        return result
+
+
+class BenchmarkTestCase(BenchmarkMixin, TestCase):
+    """
+    Base class of the benchmarks, each test runs inside a transaction.
+    """
+
+
+class TransactionBenchmarkTestCase(BenchmarkMixin, TransactionTestCase):
+    """
+    Base class of the benchmarks that run on multiple threads, so the data is committed to
+    be visible to the connection of each thread.
+    """
@@ -0,0 +1,74 @@
+"""
+Circuit breaker backed by the Django cache, so its state is shared between processes.
+"""
+import logging
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Stop calling an unavailable service after `failure_threshold` consecutive failures.
+
+    While open, the calls are short-circuited. After `recovery_timeout` seconds the circuit is
+    half open and a single call is allowed to probe the service; if it succeeds the circuit is
+    closed, otherwise it stays open for another `recovery_timeout` seconds.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._failures_key = f"nau_extensions.circuit_breaker.{name}.failures"
+        self._opened_at_key = f"nau_extensions.circuit_breaker.{name}.opened_at"
+        self._probe_key = f"nau_extensions.circuit_breaker.{name}.probe"
+
+    @property
+    def is_open(self) -> bool:
+        """
+        If the circuit is open, independently of being ready to be probed.
+        """
+        return cache.get(self._opened_at_key) is not None
+
+    def allow_request(self) -> bool:
+        """
+        Check if a call to the service is allowed.
+        """
+        opened_at = cache.get(self._opened_at_key)
+        if opened_at is None:
+            return True
+        if time.time() - opened_at < self.recovery_timeout:
+            return False
+        # half open, only the first caller probes the service
+        return cache.add(self._probe_key, True, timeout=self.recovery_timeout)
+
+    def record_success(self):
+        """
+        Register a successful call, closing the circuit.
+        """
+        if cache.get(self._failures_key) or cache.get(self._opened_at_key) is not None:
+            if self.is_open:
+                logger.info("Circuit breaker [%s] closed", self.name)
+            cache.delete_many([self._failures_key, self._opened_at_key, self._probe_key])
+
+    def record_failure(self):
+        """
+        Register a failed call, opening the circuit when the threshold is reached.
+        """
+        cache.add(self._failures_key, 0, timeout=None)
+        try:
+            failures = cache.incr(self._failures_key)
+        except ValueError:
+            # the key has been evicted or deleted meanwhile
+            cache.set(self._failures_key, 1, timeout=None)
+            failures = 1
+        if failures >= self.failure_threshold:
+            if not self.is_open:
+                logger.warning(
+                    "Circuit breaker [%s] opened after %d consecutive failures", self.name, failures
+                )
+            cache.set(self._opened_at_key, time.time(), timeout=None)
+            cache.delete(self._probe_key)
@@ -1,20 +1,64 @@
 """
 Service layer of the integration with nau-financial-manager service.
 """
+import hashlib
 import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Lock
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.dispatch import receiver
+from django.utils import timezone
+from nau_extensions import metrics
+from nau_extensions.circuit_breaker import CircuitBreaker
 from nau_extensions.models import (BasketBillingInformation,
-                                   BasketTransactionIntegration)
-from nau_extensions.utils import get_order
-from opaque_keys.edx.keys import CourseKey
+                                   BasketTransactionIntegration,
+                                   BasketTransactionIntegrationArchive,
+                                   BasketTransactionIntegrationAttempt)
+from nau_extensions.serialization import compress, encode_json
+from nau_extensions.utils import get_course_org_and_code, get_order
 from oscar.core.loading import get_class, get_model
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 Selector = get_class("partner.strategy", "Selector")
 Order = get_model("order", "Order")
+Line = get_model("order", "Line")
+Source = get_model("payment", "Source")
+
+# The related objects of an order used to build the nau-financial-manager request data.
+ORDER_PREFETCHES = (
+    Prefetch("sources", queryset=Source.objects.order_by("pk")),
+    Prefetch("lines", queryset=Line.objects.select_related("product__course")),
+)
+
+# The fields of the BasketTransactionIntegration saved from each response.
+RESPONSE_FIELDS = (
+    "response",
+    "response_status_code",
+    "response_transaction_id",
+    "response_error_fields",
+    "response_receipt_reference",
+    "response_body",
+)
+
+# The keys of the response of the nau-financial-manager with the receipt reference.
+RESPONSE_RECEIPT_REFERENCE_KEYS = ("receipt_reference", "receipt_link", "document_id")
+
+_clients = {}
+_clients_lock = Lock()
+_prefetch_executor = None
+_prefetch_executor_lock = Lock()
 
 
 def is_financial_manager_enabled(site) -> bool:
@@ -33,8 +77,16 @@ def is_financial_manager_enabled(site) -> bool:
     return enabled
 
 
-def _get_financial_manager_setting(site, key, default=None):
-    partner_short_code = site.siteconfiguration.partner.short_code
+def is_financial_manager_outbox_enabled() -> bool:
+    """
+    Check if the `NAU_FINANCIAL_MANAGER_OUTBOX` setting is enabled.
+    On outbox mode the checkout only persists the `BasketTransactionIntegration` and the
+    `financial_manager_outbox_worker` management command is responsible to send it.
+    """
+    return getattr(settings, "NAU_FINANCIAL_MANAGER_OUTBOX", False)
+
+
+def _get_partner_financial_manager_setting(partner_short_code, key, default=None):
     if not default and key not in settings.NAU_FINANCIAL_MANAGER[partner_short_code.lower()]:
         msg = f"Missing setting `NAU_FINANCIAL_MANAGER['{partner_short_code.lower()}']['{key}']`"
         logger.warning(msg)
@@ -42,17 +94,269 @@ def _get_financial_manager_setting(site, key, default=None):
     return settings.NAU_FINANCIAL_MANAGER[partner_short_code.lower()].get(key, default)
 
 
-def sync_request_data(bti: BasketTransactionIntegration) -> dict:
+class FinancialManagerCircuitOpenError(Exception):
+    """
+    The call to the nau-financial-manager was short-circuited, because it's failing.
+    """
+
+
+class FinancialManagerClient:
+    """
+    HTTP client to the nau-financial-manager service of a partner.
+    It keeps a pooled keep-alive `requests.Session`, so the TCP and TLS connections are
+    reused between calls.
+
+    Optional settings of each partner on `NAU_FINANCIAL_MANAGER`:
+    - `pool-size` maximum number of connections kept on the pool;
+    - `connect-timeout` seconds to wait to establish a connection;
+    - `timeout` seconds to wait for the response of a sent transaction;
+    - `receipt-link-timeout` seconds to wait for the response of a receipt link;
+    - `retries` number of retries on connection errors;
+    - `circuit-breaker-threshold` consecutive failures that stop the calls for a while;
+    - `circuit-breaker-recovery-timeout` seconds to wait before probing again a failing service;
+    - `gzip-min-size` compress the transactions with at least this number of bytes, by default
+      they aren't compressed.
+    """
+
+    def __init__(self, partner_short_code):
+        self.partner_short_code = partner_short_code.lower()
+        self.connect_timeout = self._setting("connect-timeout", 5)
+        self.timeout = self._setting("timeout", 30)
+        self.receipt_link_timeout = self._setting("receipt-link-timeout", 10)
+        self.gzip_min_size = settings.NAU_FINANCIAL_MANAGER[self.partner_short_code].get("gzip-min-size")
+        pool_size = self._setting("pool-size", 10)
+        # Only retry the errors establishing the connection, because the request
+        # hasn't reached the nau-financial-manager yet.
+        max_retries = Retry(
+            total=self._setting("retries", 3),
+            read=0,
+            redirect=0,
+            status=0,
+            backoff_factor=0.1,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=max_retries
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.circuit_breaker = CircuitBreaker(
+            f"financial_manager.{self.partner_short_code}",
+            failure_threshold=self._setting("circuit-breaker-threshold", 5),
+            recovery_timeout=self._setting("circuit-breaker-recovery-timeout", 60),
+        )
+
+    def _setting(self, key, default=None):
+        return _get_partner_financial_manager_setting(self.partner_short_code, key, default)
+
+    def _call(self, operation, method, url, **kwargs):
+        """
+        Make the HTTP call, protected by the circuit breaker.
+        The number of calls and their latency are recorded by `operation` and status.
+        Raises `FinancialManagerCircuitOpenError` when the circuit is open.
+        """
+        if not self.circuit_breaker.allow_request():
+            self._record_call(operation, "circuit_open")
+            raise FinancialManagerCircuitOpenError(
+                f"Financial manager of partner `{self.partner_short_code}` is unavailable"
+            )
+        start = time.monotonic()
+        try:
+            response = method(url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.circuit_breaker.record_failure()
+            self._record_call(operation, "error", time.monotonic() - start)
+            raise
+        if response.status_code >= 500:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+        self._record_call(operation, response.status_code, time.monotonic() - start)
+        return response
+
+    def _record_call(self, operation, status, duration=None):
+        metrics.increment(
+            "nau_financial_manager_requests_total",
+            partner=self.partner_short_code,
+            operation=operation,
+            status=status,
+        )
+        if duration is not None:
+            metrics.observe(
+                "nau_financial_manager_request_duration_seconds",
+                duration,
+                partner=self.partner_short_code,
+                operation=operation,
+            )
+
+    def send_transaction(self, data, body=None):
+        """
+        Send the transaction data to the nau-financial-manager.
+        The `body` is the already encoded `data`, otherwise the `data` is encoded.
+        """
+        if body is None:
+            body = encode_json(data)
+        headers = {"Authorization": self._setting("token"), "Content-Type": "application/json"}
+        if self.gzip_min_size is not None and len(body) >= self.gzip_min_size:
+            body = compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return self._call(
+            "send",
+            self.session.post,
+            self._setting("url"),
+            data=body,
+            headers=headers,
+            timeout=(self.connect_timeout, self.timeout),
+        )
+
+    def get_receipt_link(self, transaction_id):
+        """
+        Get the receipt link of a transaction from the nau-financial-manager.
+        """
+        receipt_link_url = self._setting("receipt-link-url")
+        if not receipt_link_url.endswith('/'):
+            receipt_link_url += '/'
+        receipt_link_url += transaction_id + '/'
+        return self._call(
+            "receipt_link",
+            self.session.get,
+            receipt_link_url,
+            headers={"Authorization": self._setting("token")},
+            timeout=(self.connect_timeout, self.receipt_link_timeout),
+        )
+
+    def close(self):
+        """
+        Close the pooled connections.
+        """
+        self.session.close()
+
+
+def get_financial_manager_client(site) -> FinancialManagerClient:
+    """
+    Get the `FinancialManagerClient` of the `site` partner, reused by all the calls of this process.
+    """
+    partner_short_code = site.siteconfiguration.partner.short_code.lower()
+    with _clients_lock:
+        client = _clients.get(partner_short_code)
+        if client is None:
+            client = FinancialManagerClient(partner_short_code)
+            _clients[partner_short_code] = client
+    return client
+
+
+@receiver(setting_changed)
+def _reset_financial_manager_clients(setting, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the cached clients when the `NAU_FINANCIAL_MANAGER` setting is changed, e.g. on tests.
+    """
+    if setting == "NAU_FINANCIAL_MANAGER":
+        with _clients_lock:
+            for client in _clients.values():
+                client.close()
+            _clients.clear()
+
+
+def get_request_hash(request_data) -> str:
+    """
+    Get the content hash of the request data sent to the nau-financial-manager.
+    """
+    return hashlib.sha256(encode_json(request_data)).hexdigest()
+
+
+def _set_request_data(bti: BasketTransactionIntegration, request_data) -> bool:
+    """
+    Set the request data, its encoded body and its hash on the BasketTransactionIntegration
+    instance, the data is encoded only once.
+    Returns if the request data has changed.
+    """
+    request_body = encode_json(request_data)
+    request_hash = hashlib.sha256(request_body).hexdigest()
+    changed = request_hash != bti.request_hash
+    bti.request = request_data
+    bti.request_body = request_body
+    bti.request_hash = request_hash
+    return changed
+
+
+def sync_request_data(bti: BasketTransactionIntegration, save=True) -> dict:
     """
     Synchronize the basket information with this BasketTransactionIntegration instance
     `request` field.
+    It's only saved if the request data has changed, use `save=False` to not save it at all.
     """
+    start = time.monotonic()
     # initialize strategy
     basket = bti.basket
     basket.strategy = Selector().strategy(user=basket.owner)
     bbi = BasketBillingInformation.get_by_basket(basket)
     order = get_order(basket)
 
+    request_data = _build_request_data(basket, bbi, order)
+    bti.request_build_duration = time.monotonic() - start
+
+    # update the request that will be sent to nau-financial-manager
+    changed = _set_request_data(bti, request_data)
+    if save and changed:
+        if bti.pk:
+            bti.save(update_fields=["request", "request_hash", "modified"])
+        else:
+            bti.save()
+
+    # return also the data
+    return request_data
+
+
+def sync_request_data_bulk(btis) -> list:
+    """
+    Synchronize the `request` field of multiple BasketTransactionIntegration instances.
+    It produces the same data as `sync_request_data`, but using a fixed number of queries
+    independently of the number of instances and of its order lines.
+    Returns the request data of each instance.
+    """
+    btis = list(btis)
+    if not btis:
+        return []
+    prefetch_related_objects(btis, "basket__owner")
+    basket_ids = [bti.basket_id for bti in btis]
+
+    bbis = {
+        bbi.basket_id: bbi
+        for bbi in BasketBillingInformation.objects.filter(basket_id__in=basket_ids).select_related("country")
+    }
+    orders = {}
+    for order in Order.objects.filter(basket_id__in=basket_ids).prefetch_related(*ORDER_PREFETCHES):
+        # the same order that `get_order` would return
+        orders.setdefault(order.basket_id, order)
+
+    now = timezone.now()
+    result = []
+    changed = []
+    for bti in btis:
+        start = time.monotonic()
+        basket = bti.basket
+        basket.strategy = Selector().strategy(user=basket.owner)
+        request_data = _build_request_data(basket, bbis.get(basket.id), orders.get(basket.id))
+        bti.request_build_duration = time.monotonic() - start
+        if _set_request_data(bti, request_data):
+            bti.modified = now
+            changed.append(bti)
+        result.append(request_data)
+
+    # update the requests that will be sent to nau-financial-manager, only if changed
+    if changed:
+        BasketTransactionIntegration.objects.bulk_update(changed, ["request", "request_hash", "modified"])
+    return result
+
+
+def _build_request_data(basket, bbi, order) -> dict:
+    """
+    Build the data sent to the nau-financial-manager.
+    """
+    # load all the order lines, products and courses with a fixed number of queries,
+    # it doesn't query again if they have already been prefetched
+    prefetch_related_objects([order], *ORDER_PREFETCHES)
+
     client_name = ' '.join(filter(None, [getattr(bbi, "first_name", None), getattr(bbi, "last_name", None)]))
     # fall back to the requested user full name, received from LMS.
     if not client_name:
@@ -70,7 +374,7 @@ def sync_request_data(bti: BasketTransactionIntegration) -> dict:
     vat_identification_country = bbi.country.iso_3166_1_a2 if bbi else None
 
     # generate a dict with all request data
-    request_data = {
+    return {
         "transaction_id": basket.order_number,
         "transaction_type": "credit",
         "client_name": client_name,
@@ -90,16 +394,11 @@ def sync_request_data(bti: BasketTransactionIntegration) -> dict:
         "items": _convert_order_lines(order),
     }
 
-    # update the request that will be sent to nau-financial-manager
-    bti.request = request_data
-    bti.save()
-
-    # return also the data
-    return request_data
-
 
 def _get_payment_type(order):
-    source = order.sources.first()
+    # use `all()` so the prefetched sources are reused
+    sources = sorted(order.sources.all(), key=lambda source: source.pk)
+    source = sources[0] if sources else None
     if source:
         if source.card_type:
             return source.card_type
@@ -110,13 +409,18 @@ def _convert_order_lines(order):
     """
     Convert the Ecommerce order lines to the nau-financial-manager format.
     """
+    prefetch_related_objects([order], *ORDER_PREFETCHES)
     result = []
     for line in order.lines.all():
-        course = line.product.course
-        course_id = course.id if course else line.product.title
-        course_key = CourseKey.from_string(course.id) if course else None
-        organization_code = course_key.org if course else None
-        product_code = course_key.course if course else None
+        product = line.product
+        course = product.course
+        if course:
+            course_id = course.id
+            organization_code, product_code = get_course_org_and_code(course.id)
+        else:
+            course_id = product.title
+            organization_code = None
+            product_code = None
         unit_price_incl_tax = line.unit_price_incl_tax
         result.append(
             {
@@ -133,80 +437,357 @@ def _convert_order_lines(order):
     return result
 
 
+def get_next_attempt_at(attempt_count):
+    """
+    Calculate when a BasketTransactionIntegration that has failed `attempt_count` times should be
+    retried, using an exponential backoff with jitter.
+
+    Settings:
+    - `NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_SECONDS` delay after the first failure, default 60;
+    - `NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_MAX_SECONDS` maximum delay, default 1 day;
+    - `NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_JITTER` random variation ratio of the delay, default 0.2.
+    """
+    base_delay = getattr(settings, "NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_SECONDS", 60)
+    max_delay = getattr(settings, "NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_MAX_SECONDS", 24 * 60 * 60)
+    jitter = getattr(settings, "NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_JITTER", 0.2)
+    delay = min(max_delay, base_delay * 2 ** max(attempt_count - 1, 0))
+    delay *= random.uniform(1 - jitter, 1 + jitter)
+    return timezone.now() + timedelta(seconds=delay)
+
+
 def send_to_financial_manager_if_enabled(
     basket_transaction_integration: BasketTransactionIntegration,
+    sync_request=True,
 ) -> bool:
     """
     The service that calls the nau-financial-manager with the request data pre saved on the
     `BasketTransactionIntegration` instance, then save the response data.
+    Use `sync_request=False` when the request data has already been synchronized, e.g. using
+    `sync_request_data_bulk`.
+    Returns `False` if the integration isn't enabled or if the call was short-circuited
+    because the nau-financial-manager is failing.
     """
     site = basket_transaction_integration.basket.site
     if is_financial_manager_enabled(site):
-        sync_request_data(basket_transaction_integration)
-        url = _get_financial_manager_setting(site, "url")
-        token = _get_financial_manager_setting(site, "token")
-        response = requests.post(
-            url,
-            json=basket_transaction_integration.request,
-            headers={"Authorization": token},
-            timeout=30,
-        )
+        if sync_request:
+            sync_request_data(basket_transaction_integration)
+        client = get_financial_manager_client(site)
+        state = BasketTransactionIntegration.SENT_WITH_ERROR
+        response_json = None
+        error_class = ""
+        start = time.monotonic()
+        try:
+            response = client.send_transaction(
+                basket_transaction_integration.request, body=basket_transaction_integration.request_body
+            )
+        except FinancialManagerCircuitOpenError as e:
+            # don't count as an attempt, retry it after the circuit breaker probes the service
+            logger.warning("%s, basket_id=%s will be retried later", e, basket_transaction_integration.basket_id)
+            if not basket_transaction_integration.is_sent_with_success:
+                basket_transaction_integration.state = BasketTransactionIntegration.SENT_WITH_ERROR
+            basket_transaction_integration.next_attempt_at = timezone.now() + timedelta(
+                seconds=client.circuit_breaker.recovery_timeout
+            )
+            basket_transaction_integration.save(update_fields=["state", "next_attempt_at", "modified"])
+            _record_transaction(client, basket_transaction_integration)
+            return False
+        except requests.exceptions.RequestException as e:
+            response = None
+            error_class = type(e).__name__
+            logger.exception("Error sending to financial manager [%s]", e)
+        http_duration = time.monotonic() - start
 
         # Convert response to json
-        try:
-            response_json = response.json()
-        except Exception as e:  # pylint: disable=broad-except
-            response_json = None
-            logger.exception("Error can't parse send to financial manager response as json [%s]", e)
+        if response is not None:
+            try:
+                response_json = response.json()
+            except Exception as e:  # pylint: disable=broad-except
+                response_json = None
+                logger.exception("Error can't parse send to financial manager response as json [%s]", e)
 
-        # update state
-        state = BasketTransactionIntegration.SENT_WITH_ERROR
-        if response.status_code == 201:
-            state = BasketTransactionIntegration.SENT_WITH_SUCCESS
-
-        # is duplicate
-        if response.status_code == 400:
-            transaction_id_error = response_json.get("transaction_id", [])
-            if len(transaction_id_error) > 0 \
-                    and transaction_id_error[0] == "transaction with this transaction id already exists.":
+            # update state
+            if response.status_code == 201:
                 state = BasketTransactionIntegration.SENT_WITH_SUCCESS
 
+            # is duplicate
+            if response.status_code == 400 and response_json:
+                transaction_id_error = response_json.get("transaction_id", [])
+                if len(transaction_id_error) > 0 \
+                        and transaction_id_error[0] == "transaction with this transaction id already exists.":
+                    state = BasketTransactionIntegration.SENT_WITH_SUCCESS
+
         basket_transaction_integration.state = state
 
+        # schedule the next retry
+        basket_transaction_integration.attempt_count += 1
+        basket_transaction_integration.last_attempt_at = timezone.now()
+        basket_transaction_integration.next_attempt_at = (
+            None if basket_transaction_integration.is_sent_with_success
+            else get_next_attempt_at(basket_transaction_integration.attempt_count)
+        )
+
         # save the response output
+        _set_response_data(basket_transaction_integration, response, response_json)
+        # the request has already been saved when synchronized
+        basket_transaction_integration.save(
+            update_fields=[
+                "state", "attempt_count", "last_attempt_at", "next_attempt_at", "modified", *RESPONSE_FIELDS,
+            ] if basket_transaction_integration.pk else None
+        )
+        _record_transaction(client, basket_transaction_integration)
+        _log_attempt(client, basket_transaction_integration, response, http_duration, error_class)
 
-        basket_transaction_integration.response = response_json
-        basket_transaction_integration.save()
+        if basket_transaction_integration.is_sent_with_success \
+                and not basket_transaction_integration.receipt_link:
+            prefetch_receipt_link(basket_transaction_integration)
         return True
     return False
 
 
+def _set_response_data(bti: BasketTransactionIntegration, response, response_json):
+    """
+    Set the response on the BasketTransactionIntegration instance, keeping only its status code
+    and a few fields. The body is kept only on error, capped to the
+    `NAU_FINANCIAL_MANAGER_RESPONSE_MAX_LENGTH` setting bytes and compressed if the
+    `NAU_FINANCIAL_MANAGER_RESPONSE_COMPRESS` setting is enabled.
+    """
+    status_code = None if response is None else response.status_code
+    data = response_json if isinstance(response_json, dict) else {}
+    bti.response = None
+    bti.response_status_code = status_code
+    bti.response_transaction_id = _response_field(data.get("transaction_id"))
+    bti.response_error_fields = ",".join(data)[:255] if status_code and status_code >= 400 else ""
+    bti.response_receipt_reference = next(
+        (_response_field(data[key]) for key in RESPONSE_RECEIPT_REFERENCE_KEYS if data.get(key)), ""
+    )
+
+    body = None
+    if response is not None and bti.state == BasketTransactionIntegration.SENT_WITH_ERROR:
+        body = encode_json(response_json) if response_json is not None else response.content
+    if body:
+        body = body[:getattr(settings, "NAU_FINANCIAL_MANAGER_RESPONSE_MAX_LENGTH", 10000)]
+        if getattr(settings, "NAU_FINANCIAL_MANAGER_RESPONSE_COMPRESS", False):
+            body = compress(body)
+    bti.response_body = body or None
+
+
+def _response_field(value) -> str:
+    """
+    A response field that is saved, only if it's a string or a number.
+    """
+    if isinstance(value, (str, int)) and not isinstance(value, bool):
+        return str(value)[:255]
+    return ""
+
+
+def _record_transaction(client, bti: BasketTransactionIntegration):
+    metrics.increment(
+        "nau_financial_manager_transactions_total",
+        partner=client.partner_short_code,
+        state=bti.state,
+    )
+
+
+def _log_attempt(client, bti: BasketTransactionIntegration, response, http_duration, error_class):
+    """
+    Append the attempt to the attempts log, unless the `NAU_FINANCIAL_MANAGER_ATTEMPT_LOG`
+    setting is disabled.
+    """
+    if not getattr(settings, "NAU_FINANCIAL_MANAGER_ATTEMPT_LOG", True):
+        return
+    request_build_duration = bti.request_build_duration
+    BasketTransactionIntegrationAttempt.objects.create(
+        basket_transaction_integration=bti,
+        integration_id=bti.id,
+        partner=client.partner_short_code,
+        request_build_duration_ms=(
+            None if request_build_duration is None else round(request_build_duration * 1000)
+        ),
+        http_duration_ms=round(http_duration * 1000),
+        status_code=None if response is None else response.status_code,
+        error_class=error_class,
+    )
+    # only log the request build duration on the first attempt after building it
+    bti.request_build_duration = None
+
+
 def get_receipt_link(order):
     """
     Get the Receipt Link from NAU Financial Manager, this will transform the order_number to the receipt link.
+
+    The receipt link never changes once issued, so it's read from the `BasketTransactionIntegration`,
+    or from its archive, when it has already been received. Otherwise, it's cached for a long time,
+    and the missing receipt links are cached for a short time. Concurrent requests of the same receipt link
+    wait for the one that is fetching it from the NAU Financial Manager.
+
+    Settings:
+    - `NAU_FINANCIAL_MANAGER_RECEIPT_LINK_CACHE_TIMEOUT` seconds to cache a receipt link,
+      default 30 days;
+    - `NAU_FINANCIAL_MANAGER_RECEIPT_LINK_MISS_CACHE_TIMEOUT` seconds to cache a missing receipt
+      link, default 60.
     """
     site = order.basket.site
     if is_financial_manager_enabled(site):
+        bti = (
+            BasketTransactionIntegration.objects.filter(basket_id=order.basket_id)
+            .only("id", "receipt_link")
+            .first()
+        )
+        if bti and bti.receipt_link:
+            return bti.receipt_link
+        if bti is None:
+            receipt_link = (
+                BasketTransactionIntegrationArchive.objects.filter(basket_id=order.basket_id)
+                .values_list("receipt_link", flat=True)
+                .first()
+            )
+            if receipt_link:
+                return receipt_link
+
         transaction_id = order.basket.order_number
-        receipt_link_url = _get_financial_manager_setting(site, "receipt-link-url")
-        if not receipt_link_url.endswith('/'):
-            receipt_link_url += '/'
-        receipt_link_url += transaction_id + '/'
-        token = _get_financial_manager_setting(site, "token")
-        response = None
+        cache_key = f"nau_extensions.receipt_link.{transaction_id}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached["receipt_link"]
+
+        client = get_financial_manager_client(site)
+        lock_key = f"{cache_key}.lock"
+        lock_timeout = client.connect_timeout + client.receipt_link_timeout
+        if not cache.add(lock_key, True, timeout=lock_timeout):
+            # other request is fetching the same receipt link
+            cached = _wait_for_cache(cache_key, lock_key, lock_timeout)
+            return cached["receipt_link"] if cached is not None else None
+
         try:
-            logger.info("Get receipt link for transaction id [%s]", transaction_id)
-            response = requests.get(
-                receipt_link_url,
-                headers={"Authorization": token},
-                timeout=10,
-            )
-        except Exception as e:  # pylint: disable=broad-except
-            logger.exception("Error can't get receipt link for transaction_id [%s] error: [%s]", transaction_id, e)
-            return None
+            receipt_link, found = _fetch_receipt_link(client, transaction_id)
+            if found is not None:
+                timeout = (
+                    getattr(settings, "NAU_FINANCIAL_MANAGER_RECEIPT_LINK_CACHE_TIMEOUT", 30 * 24 * 60 * 60)
+                    if found
+                    else getattr(settings, "NAU_FINANCIAL_MANAGER_RECEIPT_LINK_MISS_CACHE_TIMEOUT", 60)
+                )
+                cache.set(cache_key, {"receipt_link": receipt_link}, timeout=timeout)
+            if found and bti:
+                _store_receipt_link(bti, receipt_link)
         finally:
-            logger.info("Received the receipt link status_code: [%d]", response.status_code if response else None)
-        if response.status_code == 200:
-            logger.info("Received the receipt link content: [%s]", response.content)
-            return response.content
+            cache.delete(lock_key)
+        return receipt_link
     return None
+
+
+def fetch_receipt_link(site, transaction_id):
+    """
+    Fetch the receipt link of a transaction directly from the NAU Financial Manager, without
+    using the cache. Returns `None` if it isn't available.
+    """
+    receipt_link, _found = _fetch_receipt_link(get_financial_manager_client(site), transaction_id)
+    return receipt_link
+
+
+def lookup_transaction(site, transaction_id):
+    """
+    Check if the NAU Financial Manager has accepted a transaction, using its receipt link.
+    Returns the receipt link and if the transaction was found, that is `None` if it's unknown
+    because the call has failed.
+    """
+    return _fetch_receipt_link(get_financial_manager_client(site), transaction_id)
+
+
+def prefetch_receipt_link(bti: BasketTransactionIntegration):
+    """
+    Fetch and save the receipt link of a `BasketTransactionIntegration` on background, after the
+    current database transaction is committed.
+    It can be disabled with the `NAU_FINANCIAL_MANAGER_RECEIPT_LINK_PREFETCH` setting.
+    """
+    if not getattr(settings, "NAU_FINANCIAL_MANAGER_RECEIPT_LINK_PREFETCH", True):
+        return
+    bti_id = bti.id
+    transaction.on_commit(lambda: _get_prefetch_executor().submit(_prefetch_receipt_link, bti_id))
+
+
+def _get_prefetch_executor():
+    global _prefetch_executor  # pylint: disable=global-statement
+    with _prefetch_executor_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "NAU_FINANCIAL_MANAGER_RECEIPT_LINK_PREFETCH_WORKERS", 2),
+                thread_name_prefix="nau-receipt-link-prefetch",
+            )
+    return _prefetch_executor
+
+
+def _prefetch_receipt_link(bti_id):
+    """
+    Background task that fetches and saves the receipt link of a `BasketTransactionIntegration`.
+    The long lived prefetch threads reuse their database connection like the request threads,
+    until it's unusable or older than the `CONN_MAX_AGE` setting.
+    """
+    close_old_connections()
+    try:
+        bti = (
+            BasketTransactionIntegration.objects.select_related(
+                "basket__site__siteconfiguration__partner"
+            )
+            .defer("request", "response", "response_body")
+            .get(id=bti_id)
+        )
+        receipt_link = fetch_receipt_link(bti.basket.site, bti.basket.order_number)
+        if receipt_link:
+            _store_receipt_link(bti, receipt_link)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception("Error prefetching receipt link of basket transaction integration id=%s [%s]", bti_id, e)
+    finally:
+        close_old_connections()
+
+
+def _store_receipt_link(bti: BasketTransactionIntegration, receipt_link):
+    bti.receipt_link = receipt_link
+    bti.receipt_link_fetched_at = timezone.now()
+    bti.save(update_fields=["receipt_link", "receipt_link_fetched_at"])
+
+
+def _wait_for_cache(cache_key, lock_key, timeout, interval=0.05):
+    """
+    Wait until the `cache_key` is on the cache, or return `None` when the `lock_key` is released
+    without caching it, e.g. because the call has failed, or after the `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        if cache.get(lock_key) is None:
+            # it could have been cached just before releasing the lock
+            return cache.get(cache_key)
+    return None
+
+
+def _fetch_receipt_link(client, transaction_id):
+    """
+    Fetch the receipt link of a transaction from the NAU Financial Manager.
+    Returns the receipt link and if it was found, or `None` if the response is unknown because
+    the call has failed with other status than 404.
+    """
+    response = None
+    try:
+        logger.info("Get receipt link for transaction id [%s]", transaction_id)
+        response = client.get_receipt_link(transaction_id)
+    except FinancialManagerCircuitOpenError as e:
+        logger.warning("%s, can't get receipt link for transaction_id [%s]", e, transaction_id)
+        return None, None
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception("Error can't get receipt link for transaction_id [%s] error: [%s]", transaction_id, e)
+        return None, None
+    finally:
+        logger.info("Received the receipt link status_code: [%s]", response.status_code if response else None)
+    if response.status_code == 200:
+        logger.info("Received the receipt link content: [%s]", response.content)
+        receipt_link = response.content
+        if isinstance(receipt_link, bytes):
+            receipt_link = receipt_link.decode()
+        return receipt_link, True
+    if response.status_code == 404:
+        return None, False
+    # e.g. an invalid token or rate limited, it doesn't tell if the transaction exists
+    return None, None
@@ -0,0 +1,225 @@
+"""
+Stand-in of the nau-financial-manager service, to test and benchmark the integration end to end
+without the real service.
+
+It implements the endpoints used by the integration, with a configurable latency and
+fault injection:
+- `POST /api/billing/transaction-complete/` registers a transaction, a duplicate transaction
+  is answered with the same 400 error of the real service;
+- `GET /api/billing/receipt-link/<transaction_id>/` returns the receipt link of a registered
+  transaction.
+"""
+import gzip
+import json
+import logging
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_PATH = "/api/billing/transaction-complete/"
+RECEIPT_LINK_PATH_REGEX = re.compile(r"^/api/billing/receipt-link/(?P<transaction_id>[^/]+)/$")
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential")
+
+
+class FinancialManagerStubServer:
+    """
+    HTTP server that behaves like the nau-financial-manager.
+
+    `latency_distribution` of the time to answer each request, with a mean of `latency_mean`
+    seconds: `constant`, `uniform` between zero and twice the mean, or `exponential`;
+    `error_rate` fraction of the requests answered with a 500 error;
+    `timeout_rate` fraction of the requests answered only after `timeout_seconds`;
+    `token` if defined, the expected `Authorization` header;
+    `seed` of the random generator, to reproduce a run.
+
+    Example as a test fixture:
+        with FinancialManagerStubServer(error_rate=0.1) as server:
+            server.transaction_url
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency_distribution="constant",
+        latency_mean=0,
+        error_rate=0,
+        timeout_rate=0,
+        timeout_seconds=60,
+        token=None,
+        seed=None,
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution `{latency_distribution}`")
+        self.latency_distribution = latency_distribution
+        self.latency_mean = latency_mean
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.token = token
+        self.transactions = {}
+        self.request_count = 0
+        self._lock = Lock()
+        self._random = random.Random(seed)
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), _handler_class(self))
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def transaction_url(self) -> str:
+        return self.url + TRANSACTION_PATH
+
+    @property
+    def receipt_link_url(self) -> str:
+        return self.url + "/api/billing/receipt-link/"
+
+    def serve_forever(self):
+        """
+        Serve on the current thread until it's interrupted.
+        """
+        self.httpd.serve_forever()
+
+    def start(self):
+        """
+        Serve on a background thread.
+        """
+        self._thread = Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket.
+        """
+        if self._thread:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _next_fault(self):
+        """
+        Draw the latency and the injected fault of a request.
+        Returns the seconds to wait and if it should fail.
+        """
+        with self._lock:
+            self.request_count += 1
+            if self.latency_distribution == "uniform":
+                latency = self._random.uniform(0, 2 * self.latency_mean)
+            elif self.latency_distribution == "exponential" and self.latency_mean:
+                latency = self._random.expovariate(1 / self.latency_mean)
+            else:
+                latency = self.latency_mean
+            if self._random.random() < self.timeout_rate:
+                latency = self.timeout_seconds
+            failed = self._random.random() < self.error_rate
+        return latency, failed
+
+    def register_transaction(self, data) -> bool:
+        """
+        Register a transaction, returns `False` if it was already registered.
+        """
+        with self._lock:
+            if data["transaction_id"] in self.transactions:
+                return False
+            self.transactions[data["transaction_id"]] = data
+            return True
+
+    def get_receipt_link(self, transaction_id):
+        """
+        The receipt link of a registered transaction, `None` if it isn't registered.
+        """
+        with self._lock:
+            if transaction_id not in self.transactions:
+                return None
+        return f"{self.url}/receipts/{transaction_id}.pdf"
+
+
+def _handler_class(server):
+    """
+    Create the request handler class bound to the stub `server`.
+    """
+
+    class FinancialManagerStubHandler(BaseHTTPRequestHandler):
+        """
+        Handle the requests of the nau-financial-manager endpoints.
+        """
+
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):  # pylint: disable=invalid-name
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            if not self._before_response():
+                return
+            if self.path != TRANSACTION_PATH:
+                self._respond(404, {"detail": "Not found."})
+                return
+            try:
+                data = json.loads(body)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict) or "transaction_id" not in data:
+                self._respond(400, {"transaction_id": ["This field is required."]})
+                return
+            if server.register_transaction(data):
+                self._respond(201, data)
+            else:
+                self._respond(
+                    400, {"transaction_id": ["transaction with this transaction id already exists."]}
+                )
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            if not self._before_response():
+                return
+            match = RECEIPT_LINK_PATH_REGEX.match(self.path)
+            receipt_link = match and server.get_receipt_link(match.group("transaction_id"))
+            if not receipt_link:
+                self._respond(404, {"detail": "Not found."})
+                return
+            self._respond(200, receipt_link.encode(), content_type="text/plain")
+
+        def _before_response(self) -> bool:
+            """
+            Wait the latency and inject the faults, returns if the request should continue.
+            """
+            latency, failed = server._next_fault()  # pylint: disable=protected-access
+            if latency:
+                time.sleep(latency)
+            if server.token and self.headers.get("Authorization") != server.token:
+                self._respond(401, {"detail": "Invalid token."})
+                return False
+            if failed:
+                self._respond(500, {"detail": "Injected error."})
+                return False
+            return True
+
+        def _respond(self, status_code, data, content_type="application/json"):
+            body = data if isinstance(data, bytes) else json.dumps(data).encode()
+            self.send_response(status_code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return FinancialManagerStubHandler
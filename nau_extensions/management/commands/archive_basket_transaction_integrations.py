@@ -0,0 +1,142 @@
+"""
+Archive the old Basket Transaction Integrations sent with success, so the queries on the live
+table don't slow down as it grows.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from nau_extensions.models import (BasketTransactionIntegration,
+                                   BasketTransactionIntegrationArchive)
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Command that moves the BasketTransactionIntegration objects sent with success before a
+    number of days to the BasketTransactionIntegrationArchive table.
+    Each chunk is locked, copied and deleted on its own short transaction, with a pause between
+    the chunks, so the live table isn't locked for long. An interrupted run can be repeated safely,
+    the objects already copied aren't copied again. The attempts of the archived objects are kept,
+    with the id of the archived object on their `integration_id`.
+
+    Example to archive the objects older than a year:
+      python manage.py archive_basket_transaction_integrations --days=365
+
+    Example to count the objects that would be archived:
+      python manage.py archive_basket_transaction_integrations --dry_run
+    """
+
+    help = "Archive the old BasketTransactionIntegration objects sent with success"
+
+    def add_arguments(self, parser):
+        """
+        Arguments to this Django Command.
+        `days` archive the objects created before this number of days, by default the
+        `NAU_FINANCIAL_MANAGER_ARCHIVE_AFTER_DAYS` setting or 365;
+        `chunk_size` number of objects archived on each transaction;
+        `sleep` seconds to pause between the chunks;
+        `limit` maximum number of objects archived on this run;
+        `dry_run` to only count the objects that would be archived.
+        """
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "NAU_FINANCIAL_MANAGER_ARCHIVE_AFTER_DAYS", 365),
+            help="Archive the objects created before this number of days",
+        )
+        parser.add_argument(
+            "--chunk_size",
+            type=int,
+            default=500,
+            help="Number of objects archived on each transaction",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1,
+            help="Seconds to pause between the chunks",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Maximum number of objects archived on this run",
+        )
+        parser.add_argument(
+            "--dry_run",
+            action="store_true",
+            default=False,
+            help="Only count the objects that would be archived",
+        )
+
+    def handle(self, *args, **kwargs):
+        """
+        Archive the Basket Transaction Integrations.
+        """
+        btis = BasketTransactionIntegration.objects.filter(
+            state=BasketTransactionIntegration.SENT_WITH_SUCCESS,
+            created__lt=timezone.now() - timedelta(days=kwargs["days"]),
+        )
+        if kwargs["dry_run"]:
+            log.info("Would archive %d basket transaction integrations", btis.count())
+            return
+
+        limit = kwargs["limit"]
+        count = 0
+        while limit is None or count < limit:
+            chunk_size = kwargs["chunk_size"] if limit is None else min(kwargs["chunk_size"], limit - count)
+            archived = self._archive_chunk(btis, chunk_size)
+            if not archived:
+                break
+            count += archived
+            log.info("Archived %d basket transaction integrations", count)
+            time.sleep(kwargs["sleep"])
+
+        log.info("Archived %d basket transaction integrations in total", count)
+
+    def _archive_chunk(self, btis, chunk_size) -> int:
+        """
+        Copy the oldest objects to the archive and delete them, on a single transaction.
+        Returns the number of archived objects.
+        """
+        with transaction.atomic():
+            # lock the chunk, so its objects can't change until they are deleted, the objects
+            # locked by other transactions are left for a next run
+            ids = list(
+                btis.select_for_update(skip_locked=True)
+                .order_by("created", "id")
+                .values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                return 0
+            # a single row for each object, even if its basket has more than one order
+            rows = {
+                row["id"]: row
+                for row in BasketTransactionIntegration.objects.filter(id__in=ids).values(
+                    *BasketTransactionIntegrationArchive.COPIED_FIELDS,
+                    order_number=F("basket__order__number"),
+                    partner=F("basket__site__siteconfiguration__partner__short_code"),
+                )
+            }
+            archived_ids = set(
+                BasketTransactionIntegrationArchive.objects.filter(id__in=ids).values_list("id", flat=True)
+            )
+            BasketTransactionIntegrationArchive.objects.bulk_create(
+                [
+                    BasketTransactionIntegrationArchive(
+                        **{**row, "order_number": row["order_number"] or "", "partner": row["partner"] or ""}
+                    )
+                    for row in rows.values()
+                    if row["id"] not in archived_ids
+                ]
+            )
+            BasketTransactionIntegration.objects.filter(id__in=ids).delete()
+        return len(ids)
@@ -0,0 +1,102 @@
+"""
+Fill the receipt link of the Basket Transaction Integrations that have been sent to the
+Financial Manager system.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from nau_extensions.financial_manager import (fetch_receipt_link,
+                                              is_financial_manager_enabled)
+from nau_extensions.models import BasketTransactionIntegration
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Command that fetches from the Financial Manager system the receipt links of the
+    BasketTransactionIntegration objects sent with success that don't have it yet.
+    The objects are processed in batches, the receipt links of each batch are fetched
+    concurrently and then saved with a single query.
+
+    Example:
+      python manage.py backfill_receipt_links --batch_size=200 --workers=8
+    """
+
+    help = (
+        "Fill the receipt link of the BasketTransactionIntegration objects sent with success "
+        "to the Financial Manager system"
+    )
+
+    def add_arguments(self, parser):
+        """
+        Arguments to this Django Command.
+        `batch_size` number of objects processed on each batch;
+        `workers` number of concurrent requests to the Financial Manager system.
+        """
+        parser.add_argument(
+            "--batch_size",
+            type=int,
+            default=100,
+            help="Number of objects processed on each batch",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of concurrent requests to the financial manager",
+        )
+
+    def handle(self, *args, **kwargs):
+        """
+        Fill the receipt links, print to console its progress.
+        """
+        batch_size = kwargs["batch_size"]
+        workers = kwargs["workers"]
+
+        btis = (
+            BasketTransactionIntegration.objects.filter(
+                state=BasketTransactionIntegration.SENT_WITH_SUCCESS,
+                receipt_link__isnull=True,
+                basket__isnull=False,
+            )
+            .select_related("basket__site__siteconfiguration__partner")
+            .defer("request", "response", "response_body")
+            .order_by("id")
+        )
+
+        total_count = 0
+        filled_count = 0
+        last_id = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                batch = list(btis.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                total_count += len(batch)
+
+                batch = [bti for bti in batch if is_financial_manager_enabled(bti.basket.site)]
+                receipt_links = executor.map(
+                    lambda bti: fetch_receipt_link(bti.basket.site, bti.basket.order_number),
+                    batch,
+                )
+                now = timezone.now()
+                filled = []
+                for bti, receipt_link in zip(batch, receipt_links):
+                    if receipt_link:
+                        bti.receipt_link = receipt_link
+                        bti.receipt_link_fetched_at = now
+                        filled.append(bti)
+                BasketTransactionIntegration.objects.bulk_update(
+                    filled, ["receipt_link", "receipt_link_fetched_at"]
+                )
+                filled_count += len(filled)
+                log.info("Filled %d of %d receipt links", filled_count, total_count)
+
+        log.info("Results:")
+        log.info("Receipt links filled %d", filled_count)
+        log.info("Total without receipt link: %d", total_count)
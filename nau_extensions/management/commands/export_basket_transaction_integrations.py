@@ -0,0 +1,225 @@
+"""
+Export the Basket Transaction Integrations, e.g. for the monthly reconciliation with the
+Financial Manager system.
+"""
+
+import csv
+import gzip
+import io
+import json
+import logging
+import sys
+from contextlib import ExitStack
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+from nau_extensions.models import BasketTransactionIntegration
+from nau_extensions.serialization import decode_body
+
+log = logging.getLogger(__name__)
+
+# the exported fields of each object, the request totals are read from its `request`
+# and the `response` is the body kept on error
+FIELDS = (
+    "id",
+    "partner",
+    "basket_id",
+    "transaction_id",
+    "state",
+    "created",
+    "modified",
+    "attempt_count",
+    "last_attempt_at",
+    "total_amount_include_vat",
+    "total_discount_incl_tax",
+    "currency",
+    "receipt_link",
+    "response_status_code",
+    "response_transaction_id",
+    "response_error_fields",
+    "response_receipt_reference",
+    "response",
+)
+
+REQUEST_FIELDS = ("transaction_id", "total_amount_include_vat", "total_discount_incl_tax", "currency")
+
+
+class Command(BaseCommand):
+    """
+    Command that streams the BasketTransactionIntegration objects as CSV or JSON Lines.
+    The objects are read in chunks ordered by id and written incrementally, so the memory
+    usage is constant independently of the number of exported objects.
+
+    Example to export a month to a compressed file:
+      python manage.py export_basket_transaction_integrations --start_date=2026-09-01 \
+        --end_date=2026-09-30 --output=2026-09.csv.gz
+
+    Example to export the objects sent with error of a partner to the console:
+      python manage.py export_basket_transaction_integrations --format=jsonl \
+        --state="Sent with error" --partner=edx
+    """
+
+    help = "Export the BasketTransactionIntegration objects as CSV or JSON Lines"
+
+    def add_arguments(self, parser):
+        """
+        Arguments to this Django Command.
+        `format` of the output, `csv` or `jsonl`;
+        `output` file, by default the console;
+        `gzip` to compress the output, the default if the output file ends with `.gz`;
+        `start_date` and `end_date` inclusive range of the creation date;
+        `state` to export, can be repeated;
+        `partner` short code to export;
+        `chunk_size` number of objects read from the database on each query.
+        """
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            default="csv",
+            help="Format of the output",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="-",
+            help="Output file, by default the console",
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            default=False,
+            help="Compress the output with gzip, the default if the output file ends with .gz",
+        )
+        parser.add_argument(
+            "--start_date",
+            type=date.fromisoformat,
+            default=None,
+            help="Export the objects created since this date, e.g. 2026-09-01",
+        )
+        parser.add_argument(
+            "--end_date",
+            type=date.fromisoformat,
+            default=None,
+            help="Export the objects created until this date inclusive, e.g. 2026-09-30",
+        )
+        parser.add_argument(
+            "--state",
+            action="append",
+            choices=[state for state, _ in BasketTransactionIntegration.state_choices],
+            default=None,
+            help="State of the objects to export, can be repeated",
+        )
+        parser.add_argument(
+            "--partner",
+            type=str,
+            default=None,
+            help="Short code of the partner of the objects to export",
+        )
+        parser.add_argument(
+            "--chunk_size",
+            type=int,
+            default=1000,
+            help="Number of objects read from the database on each query",
+        )
+
+    def handle(self, *args, **kwargs):
+        """
+        Export the Basket Transaction Integrations.
+        """
+        btis = BasketTransactionIntegration.objects.all()
+        if kwargs["start_date"]:
+            btis = btis.filter(created__gte=_start_of_day(kwargs["start_date"]))
+        if kwargs["end_date"]:
+            btis = btis.filter(created__lt=_start_of_day(kwargs["end_date"] + timedelta(days=1)))
+        if kwargs["state"]:
+            btis = btis.filter(state__in=kwargs["state"])
+        if kwargs["partner"]:
+            btis = btis.filter(basket__site__siteconfiguration__partner__short_code__iexact=kwargs["partner"])
+
+        output = kwargs["output"]
+        use_gzip = kwargs["gzip"] or output.endswith(".gz")
+        with ExitStack() as stack:
+            stream = stack.enter_context(open(output, "wb")) if output != "-" else sys.stdout.buffer
+            if use_gzip:
+                stream = stack.enter_context(gzip.GzipFile(fileobj=stream, mode="wb"))
+            text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+            # don't close the underlying stream, e.g. the console
+            stack.callback(text.detach)
+            stack.callback(text.flush)
+
+            write = self._csv_writer(text) if kwargs["format"] == "csv" else self._jsonl_writer(text)
+            count = 0
+            for row in self._rows(btis, kwargs["chunk_size"]):
+                write(row)
+                count += 1
+
+        log.info("Exported %d basket transaction integrations", count)
+
+    def _rows(self, btis, chunk_size):
+        """
+        Yield the exported fields of each object, reading the objects in chunks ordered by id,
+        so each query is small and uses the primary key index.
+        """
+        btis = btis.values(
+            "id",
+            "basket_id",
+            "state",
+            "created",
+            "modified",
+            "attempt_count",
+            "last_attempt_at",
+            "receipt_link",
+            "request",
+            "response",
+            "response_status_code",
+            "response_transaction_id",
+            "response_error_fields",
+            "response_receipt_reference",
+            "response_body",
+            partner=F("basket__site__siteconfiguration__partner__short_code"),
+        ).order_by("id")
+        last_id = 0
+        while True:
+            chunk = list(btis.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                return
+            last_id = chunk[-1]["id"]
+            for values in chunk:
+                request = values.pop("request") or {}
+                for field in REQUEST_FIELDS:
+                    values[field] = request.get(field)
+                response_body = values.pop("response_body")
+                if response_body is not None:
+                    values["response"] = decode_body(response_body)
+                yield values
+
+    def _csv_writer(self, text):
+        writer = csv.writer(text)
+        writer.writerow(FIELDS)
+
+        def write(row):
+            writer.writerow([_csv_value(row[field]) for field in FIELDS])
+
+        return write
+
+    def _jsonl_writer(self, text):
+        def write(row):
+            text.write(json.dumps({field: row[field] for field in FIELDS}, cls=DjangoJSONEncoder))
+            text.write("\n")
+
+        return write
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return value
+
+
+def _start_of_day(day) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
@@ -0,0 +1,182 @@
+"""
+Long running worker that sends the pending Basket Transaction Integrations to the
+Financial Manager system.
+"""
+
+import logging
+import time
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from nau_extensions.financial_manager import (
+    get_next_attempt_at, send_to_financial_manager_if_enabled)
+from nau_extensions.models import BasketTransactionIntegration
+from oscar.core.loading import get_model
+
+log = logging.getLogger(__name__)
+Basket = get_model("basket", "Basket")
+
+
+class Command(BaseCommand):
+    """
+    Command that drains the BasketTransactionIntegration objects on the `To be sent` state,
+    sending them to the Financial Manager system.
+    It should be used together with the `NAU_FINANCIAL_MANAGER_OUTBOX` setting, so the checkout
+    only persists the BasketTransactionIntegration and this worker sends it.
+    Multiple workers can run at the same time, each object is claimed for `claim_seconds`
+    before being sent, so the others skip it without holding a lock during the HTTP call.
+    Only the objects of the partners with a `NAU_FINANCIAL_MANAGER` setting are sent, and an
+    object that fails to be sent is changed to `Sent with error` and retried with a backoff.
+
+    Example:
+      python manage.py financial_manager_outbox_worker --batch_size=50 --sleep_seconds=2
+    """
+
+    help = (
+        "Send the BasketTransactionIntegration objects that are pending to be sent to the "
+        "Financial Manager system"
+    )
+
+    def add_arguments(self, parser):
+        """
+        Arguments to this Django Command.
+        `batch_size` maximum number of objects sent on each pass;
+        `sleep_seconds` time to wait when there isn't more pending objects;
+        `claim_seconds` time that an object is reserved to a worker while it's being sent;
+        `once` to run a single pass and exit.
+        """
+        parser.add_argument(
+            "--batch_size",
+            type=int,
+            default=100,
+            help="Maximum number of objects sent on each pass",
+        )
+        parser.add_argument(
+            "--sleep_seconds",
+            type=float,
+            default=5,
+            help="Seconds to wait when there are no more pending objects to send",
+        )
+        parser.add_argument(
+            "--claim_seconds",
+            type=int,
+            default=300,
+            help="Seconds that an object is reserved to a worker while it's being sent",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            default=False,
+            help="Run a single pass and exit",
+        )
+
+    def handle(self, *args, **kwargs):
+        """
+        Keep sending the pending Basket Transaction Integrations.
+        """
+        batch_size = kwargs["batch_size"]
+        sleep_seconds = kwargs["sleep_seconds"]
+        claim_seconds = kwargs["claim_seconds"]
+        once = kwargs["once"]
+
+        log.info("Starting financial manager outbox worker")
+        while True:
+            close_old_connections()
+            sent_count = self._drain(batch_size, claim_seconds)
+            if once:
+                break
+            if sent_count < batch_size:
+                time.sleep(sleep_seconds)
+
+    def _drain(self, batch_size, claim_seconds) -> int:
+        """
+        Send up to `batch_size` pending objects, returns the number of objects sent.
+        """
+        processed_count = 0
+        sent_count = 0
+        while processed_count < batch_size:
+            bti = self._claim_next(claim_seconds)
+            if bti is None:
+                break
+            processed_count += 1
+            if self._send(bti):
+                sent_count += 1
+        if processed_count:
+            log.info(
+                "Financial manager outbox processed %d, sent %d", processed_count, sent_count
+            )
+        return sent_count
+
+    def _claim_next(self, claim_seconds):
+        """
+        Claim the oldest pending object that is due, scheduling its next attempt to after the
+        claim, on a short transaction. The rows locked by other workers are skipped.
+        """
+        enabled_partners = _enabled_partners_filter()
+        if enabled_partners is None:
+            return None
+        now = timezone.now()
+        with transaction.atomic():
+            bti = (
+                BasketTransactionIntegration.objects.select_for_update(skip_locked=True)
+                .filter(enabled_partners, state=BasketTransactionIntegration.TO_BE_SENT)
+                .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+                .order_by("created")
+                .first()
+            )
+            if bti:
+                bti.next_attempt_at = now + timedelta(seconds=claim_seconds)
+                bti.save(update_fields=["next_attempt_at", "modified"])
+        return bti
+
+    def _send(self, bti) -> bool:
+        """
+        Send a claimed object, when it fails it's changed to `Sent with error` so it's retried
+        with a backoff. Returns if it has been sent.
+        """
+        # the send may have incremented it on the instance before failing
+        attempt_count = bti.attempt_count
+        try:
+            sent = send_to_financial_manager_if_enabled(bti)
+        except Exception as e:  # pylint: disable=broad-except
+            log.exception("Error sending basket transaction integration id=%d [%s]", bti.id, e)
+            sent = False
+        if not sent:
+            # only if it hasn't been saved with the outcome of the send
+            BasketTransactionIntegration.objects.filter(
+                id=bti.id, state=BasketTransactionIntegration.TO_BE_SENT
+            ).update(
+                state=BasketTransactionIntegration.SENT_WITH_ERROR,
+                attempt_count=F("attempt_count") + 1,
+                next_attempt_at=get_next_attempt_at(attempt_count + 1),
+                modified=timezone.now(),
+            )
+        return sent
+
+
+def _enabled_partners_filter():
+    """
+    Filter of the objects of the partners with a `NAU_FINANCIAL_MANAGER` setting,
+    `None` if there isn't any.
+    """
+    partner_short_codes = getattr(settings, "NAU_FINANCIAL_MANAGER", None) or {}
+    if not partner_short_codes:
+        return None
+    # a subquery, so only the rows of the BasketTransactionIntegration table are locked
+    return Q(
+        basket__in=Basket.objects.filter(
+            reduce(
+                or_,
+                (
+                    Q(site__siteconfiguration__partner__short_code__iexact=partner_short_code)
+                    for partner_short_code in partner_short_codes
+                ),
+            )
+        ).values("id")
+    )
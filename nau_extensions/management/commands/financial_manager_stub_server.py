@@ -0,0 +1,107 @@
+"""
+Run a stand-in of the nau-financial-manager service, to test and benchmark the integration
+without the real service.
+"""
+
+import logging
+
+from django.core.management.base import BaseCommand
+from nau_extensions.financial_manager_stub import (LATENCY_DISTRIBUTIONS,
+                                                   FinancialManagerStubServer)
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Command that runs a stub of the nau-financial-manager with configurable latency and
+    fault injection, until it's interrupted.
+    Configure the `url` and `receipt-link-url` of a partner on the `NAU_FINANCIAL_MANAGER`
+    setting with the printed URLs.
+
+    Example with a mean latency of 200ms and 1% of errors:
+      python manage.py financial_manager_stub_server --port=8089 \
+        --latency_distribution=exponential --latency_mean=0.2 --error_rate=0.01
+    """
+
+    help = "Run a stand-in of the Financial Manager system with latency and fault injection"
+
+    def add_arguments(self, parser):
+        """
+        Arguments to this Django Command.
+        `host` and `port` to listen;
+        `latency_distribution` and `latency_mean` of the time to answer each request;
+        `error_rate` fraction of requests answered with an error;
+        `timeout_rate` and `timeout_seconds` of the requests answered after a long time;
+        `token` expected on the `Authorization` header;
+        `seed` of the random generator.
+        """
+        parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to listen")
+        parser.add_argument("--port", type=int, default=8089, help="Port to listen")
+        parser.add_argument(
+            "--latency_distribution",
+            choices=LATENCY_DISTRIBUTIONS,
+            default="constant",
+            help="Distribution of the latency of each request",
+        )
+        parser.add_argument(
+            "--latency_mean",
+            type=float,
+            default=0,
+            help="Mean latency in seconds of each request",
+        )
+        parser.add_argument(
+            "--error_rate",
+            type=float,
+            default=0,
+            help="Fraction of the requests answered with a 500 error",
+        )
+        parser.add_argument(
+            "--timeout_rate",
+            type=float,
+            default=0,
+            help="Fraction of the requests answered only after the timeout seconds",
+        )
+        parser.add_argument(
+            "--timeout_seconds",
+            type=float,
+            default=60,
+            help="Seconds to answer the requests that simulate a timeout",
+        )
+        parser.add_argument(
+            "--token",
+            type=str,
+            default=None,
+            help="Expected Authorization header, by default any is accepted",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Seed of the random generator, to reproduce a run",
+        )
+
+    def handle(self, *args, **kwargs):
+        """
+        Serve the stub until it's interrupted.
+        """
+        server = FinancialManagerStubServer(
+            host=kwargs["host"],
+            port=kwargs["port"],
+            latency_distribution=kwargs["latency_distribution"],
+            latency_mean=kwargs["latency_mean"],
+            error_rate=kwargs["error_rate"],
+            timeout_rate=kwargs["timeout_rate"],
+            timeout_seconds=kwargs["timeout_seconds"],
+            token=kwargs["token"],
+            seed=kwargs["seed"],
+        )
+        log.info("Financial manager stub transaction url: %s", server.transaction_url)
+        log.info("Financial manager stub receipt link url: %s", server.receipt_link_url)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+        log.info("Financial manager stub received %d requests", server.request_count)
@@ -0,0 +1,191 @@
+"""
+Reconcile the state of the Basket Transaction Integrations with the Financial Manager system.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from nau_extensions.financial_manager import (is_financial_manager_enabled,
+                                              lookup_transaction)
+from nau_extensions.models import BasketTransactionIntegration
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Command that checks on the Financial Manager system if the BasketTransactionIntegration
+    objects have been accepted, using the receipt link endpoint, and fixes their local state.
+    - the objects not sent with success that the Financial Manager has accepted are changed
+      to sent with success, with its receipt link;
+    - the objects sent with success that the Financial Manager doesn't know are changed to
+      sent with error, so they are retried. Retrying a transaction that has been accepted
+      meanwhile is safe, the duplicate transaction is considered a success. The objects sent
+      within the grace period are left unchanged, the Financial Manager may not have their
+      receipt yet.
+    The objects are processed in chunks, the lookups of each chunk are concurrent and the
+    changes are saved with a query for each previous state, so an object whose state has
+    changed meanwhile isn't overwritten.
+
+    Example to reconcile a month without saving the changes:
+      python manage.py reconcile_financial_manager --start_date=2026-09-01 \
+        --end_date=2026-09-30 --dry_run
+    """
+
+    help = "Reconcile the state of the BasketTransactionIntegration objects with the Financial Manager system"
+
+    def add_arguments(self, parser):
+        """
+        Arguments to this Django Command.
+        `start_date` and `end_date` inclusive range of the creation date;
+        `state` to reconcile, can be repeated, by default sent with error and with success;
+        `batch_size` number of objects processed on each batch;
+        `workers` number of concurrent requests to the Financial Manager system;
+        `grace_hours` the objects sent with success in the last hours aren't changed to sent with
+        error, by default the `NAU_FINANCIAL_MANAGER_RECONCILE_GRACE_HOURS` setting or 24;
+        `dry_run` to only print the differences.
+        """
+        parser.add_argument(
+            "--start_date",
+            type=date.fromisoformat,
+            default=None,
+            help="Reconcile the objects created since this date, e.g. 2026-09-01",
+        )
+        parser.add_argument(
+            "--end_date",
+            type=date.fromisoformat,
+            default=None,
+            help="Reconcile the objects created until this date inclusive, e.g. 2026-09-30",
+        )
+        parser.add_argument(
+            "--state",
+            action="append",
+            choices=[state for state, _ in BasketTransactionIntegration.state_choices],
+            default=None,
+            help="State of the objects to reconcile, can be repeated",
+        )
+        parser.add_argument(
+            "--batch_size",
+            type=int,
+            default=100,
+            help="Number of objects processed on each batch",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of concurrent requests to the financial manager",
+        )
+        parser.add_argument(
+            "--grace_hours",
+            type=float,
+            default=getattr(settings, "NAU_FINANCIAL_MANAGER_RECONCILE_GRACE_HOURS", 24),
+            help="Don't change the objects sent with success in the last hours to sent with error",
+        )
+        parser.add_argument(
+            "--dry_run",
+            action="store_true",
+            default=False,
+            help="Only print the differences, without saving them",
+        )
+
+    def handle(self, *args, **kwargs):
+        """
+        Reconcile the Basket Transaction Integrations, print the differences found.
+        """
+        btis = BasketTransactionIntegration.objects.filter(
+            state__in=kwargs["state"] or [
+                BasketTransactionIntegration.SENT_WITH_ERROR,
+                BasketTransactionIntegration.SENT_WITH_SUCCESS,
+            ],
+            basket__isnull=False,
+        )
+        if kwargs["start_date"]:
+            btis = btis.filter(created__gte=_start_of_day(kwargs["start_date"]))
+        if kwargs["end_date"]:
+            btis = btis.filter(created__lt=_start_of_day(kwargs["end_date"] + timedelta(days=1)))
+        btis = (
+            btis.select_related("basket__site__siteconfiguration__partner")
+            .defer("request", "response", "response_body")
+            .order_by("id")
+        )
+        batch_size = kwargs["batch_size"]
+        dry_run = kwargs["dry_run"]
+
+        grace_period = timedelta(hours=kwargs["grace_hours"])
+
+        counts = {"checked": 0, "unknown": 0, "unchanged": 0, "recent": 0, "to_success": 0, "to_error": 0}
+        last_id = 0
+        with ThreadPoolExecutor(max_workers=kwargs["workers"]) as executor:
+            while True:
+                batch = list(btis.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                batch = [bti for bti in batch if is_financial_manager_enabled(bti.basket.site)]
+                lookups = executor.map(
+                    lambda bti: lookup_transaction(bti.basket.site, bti.basket.order_number),
+                    batch,
+                )
+                now = timezone.now()
+                changed = {}
+                for bti, (receipt_link, found) in zip(batch, lookups):
+                    counts["checked"] += 1
+                    if found is None:
+                        counts["unknown"] += 1
+                    elif found == bti.is_sent_with_success:
+                        counts["unchanged"] += 1
+                    elif not found and (bti.last_attempt_at or bti.created) > now - grace_period:
+                        counts["recent"] += 1
+                    else:
+                        log.info(
+                            "Basket transaction integration id=%d transaction_id=%s: %s -> %s",
+                            bti.id,
+                            bti.basket.order_number,
+                            bti.state,
+                            BasketTransactionIntegration.SENT_WITH_SUCCESS if found
+                            else BasketTransactionIntegration.SENT_WITH_ERROR,
+                        )
+                        changed.setdefault(bti.state, []).append(bti)
+                        self._reconcile(bti, found, receipt_link, now)
+                        counts["to_success" if found else "to_error"] += 1
+                if not dry_run:
+                    for state, changed_btis in changed.items():
+                        # only update the objects still on the state read, e.g. not the ones
+                        # sent meanwhile
+                        BasketTransactionIntegration.objects.filter(state=state).bulk_update(
+                            changed_btis,
+                            ["state", "next_attempt_at", "receipt_link", "receipt_link_fetched_at", "modified"],
+                        )
+
+        log.info("Results%s:", " (dry run, nothing saved)" if dry_run else "")
+        log.info("Checked %d", counts["checked"])
+        log.info("Unknown, the lookup failed %d", counts["unknown"])
+        log.info("Unchanged %d", counts["unchanged"])
+        log.info("Not found, but sent within the grace period %d", counts["recent"])
+        log.info("Changed to %s %d", BasketTransactionIntegration.SENT_WITH_SUCCESS, counts["to_success"])
+        log.info("Changed to %s %d", BasketTransactionIntegration.SENT_WITH_ERROR, counts["to_error"])
+
+    def _reconcile(self, bti, found, receipt_link, now):
+        """
+        Change the local state of the object to the state on the Financial Manager system.
+        """
+        bti.modified = now
+        if found:
+            bti.state = BasketTransactionIntegration.SENT_WITH_SUCCESS
+            bti.next_attempt_at = None
+            bti.receipt_link = receipt_link
+            bti.receipt_link_fetched_at = now
+        else:
+            # retry it as soon as possible
+            bti.state = BasketTransactionIntegration.SENT_WITH_ERROR
+            bti.next_attempt_at = None
+
+
+def _start_of_day(day) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
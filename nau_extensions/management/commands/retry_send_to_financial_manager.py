@@ -3,13 +3,20 @@ Script to synchronize courses to Richie marketing site
 """
 
 import logging
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import timedelta
+from itertools import islice
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from nau_extensions.financial_manager import \
-    send_to_financial_manager_if_enabled
+from django.db.models import Q
+from django.utils import timezone
+from nau_extensions.financial_manager import (
+    is_financial_manager_enabled, send_to_financial_manager_if_enabled,
+    sync_request_data_bulk)
 from nau_extensions.models import BasketTransactionIntegration
+from nau_extensions.utils import DatabaseThreadPoolExecutor
 from oscar.core.loading import get_model
 
 Basket = get_model("basket", "Basket")
@@ -24,9 +31,14 @@ class Command(BaseCommand):
     the Financial Manager system.
     By default, will retry the BasketTransactionIntegration objects where its state is sent with
     error and also send the pending to be sent that have been created more than 5 minutes ago.
+    The objects that have failed are only retried after its scheduled next attempt, using an
+    exponential backoff.
 
     Example to retry last 24 hours:
       python manage.py retry_send_to_financial_manager --delta_in_minutes=1440
+
+    Example to retry using 8 concurrent workers:
+      python manage.py retry_send_to_financial_manager --workers=8
     """
 
     help = (
@@ -39,7 +51,10 @@ class Command(BaseCommand):
         """
         Arguments to this Django Command.
         `basket_id` to run for a specific Basket;
-        `delta_in_minutes` to run all failed and pending on this time frame.
+        `delta_in_minutes` to run all failed and pending on this time frame;
+        `workers` number of concurrent sends;
+        `chunk_size` number of objects fetched from the database on each query;
+        `ignore_schedule` to retry without waiting for the scheduled next attempt.
         """
         parser.add_argument(
             "--basket_id",
@@ -53,25 +68,40 @@ class Command(BaseCommand):
             default=300,
             help="Delta in seconds to retry",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of concurrent sends to the financial manager",
+        )
+        parser.add_argument(
+            "--chunk_size",
+            type=int,
+            default=500,
+            help="Number of objects fetched from the database on each query",
+        )
+        parser.add_argument(
+            "--ignore_schedule",
+            action="store_true",
+            default=False,
+            help="Retry also the objects whose next attempt is scheduled to the future",
+        )
 
     def handle(self, *args, **kwargs):
         """
         Synchronize Basket Transaction Integrations to Financial Manager system,
         print to console its sync progress.
         """
-        btis: list = None
-
         basket_id = kwargs["basket_id"]
         if basket_id:
             basket = Basket.objects.get(id=basket_id)
             if not basket:
                 raise ValueError(f"No basket found for basket_id={basket_id}")
-            bti = BasketTransactionIntegration.get_by_basket(basket)
-            if not bti:
+            btis = BasketTransactionIntegration.objects.filter(basket=basket)
+            if not btis.exists():
                 raise ValueError(
                     f"No basket transaction integration found for basket_id={basket_id}"
                 )
-            btis = [bti]
         else:
             btis = BasketTransactionIntegration.objects.filter(
                 state__in=[
@@ -79,24 +109,42 @@ class Command(BaseCommand):
                     BasketTransactionIntegration.TO_BE_SENT,
                 ]
             )
+            if not kwargs["ignore_schedule"]:
+                btis = btis.filter(
+                    Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=timezone.now())
+                )
 
         delta_in_minutes = kwargs["delta_in_minutes"]
-        retry_success_count = 0
-        for bti in btis:
-            if bti.created <= datetime.now(bti.created.tzinfo) - timedelta(
-                minutes=delta_in_minutes
-            ):
-                log.info("Sending to financial manager basket_id=%d", bti.basket.id)
-                sent = send_to_financial_manager_if_enabled(bti)
-                if sent:
-                    retry_success_count += 1
-                else:
-                    log.error("Error sending basket_id=%d", bti.basket.id)
-
-        total_count = len(btis)
+        workers = kwargs["workers"]
+        chunk_size = kwargs["chunk_size"]
+
+        # Filter on the database and stream the results, the `request` and `response` fields
+        # are only loaded when each object is sent.
+        btis = (
+            btis.filter(created__lte=timezone.now() - timedelta(minutes=delta_in_minutes))
+            .select_related("basket__owner", "basket__site__siteconfiguration__partner")
+            .defer("request", "response", "response_body")
+            .order_by("id")
+            .iterator(chunk_size=chunk_size)
+        )
+        btis = self._synchronize_requests(btis, chunk_size)
+
+        start = time.monotonic()
+        if workers > 1:
+            total_count, retry_success_count = self._send_concurrently(btis, workers)
+        else:
+            total_count, retry_success_count = self._send_sequentially(btis)
+        elapsed = time.monotonic() - start
+
         log.info("Results:")
         log.info("Retry with success %d", retry_success_count)
+        log.info("Retry with error %d", total_count - retry_success_count)
         log.info("Total retries: %d", total_count)
+        log.info(
+            "Elapsed %.1f seconds, %.2f retries per second",
+            elapsed,
+            total_count / elapsed if elapsed else 0,
+        )
 
         if retry_success_count != total_count:
             url = (
@@ -107,3 +155,74 @@ class Command(BaseCommand):
             raise CommandError(
                 "Couldn't retry all pending information to financial manager"
             )
+
+    def _synchronize_requests(self, btis, chunk_size):
+        """
+        Synchronize the request data of the BasketTransactionIntegration objects in chunks,
+        using a fixed number of queries for each chunk.
+        Yields each object and if its request data still needs to be synchronized.
+        """
+        btis = iter(btis)
+        while True:
+            chunk = list(islice(btis, chunk_size))
+            if not chunk:
+                return
+            enabled = [
+                bti for bti in chunk
+                if bti.basket_id and is_financial_manager_enabled(bti.basket.site)
+            ]
+            try:
+                sync_request_data_bulk(enabled)
+                synchronized = True
+            except Exception as e:  # pylint: disable=broad-except
+                # synchronize each object individually when sending it
+                log.exception("Error synchronizing the requests data in bulk [%s]", e)
+                synchronized = False
+            for bti in chunk:
+                yield bti, not synchronized
+
+    def _send(self, bti, sync_request) -> bool:
+        """
+        Send a single BasketTransactionIntegration, returns if it was sent.
+        """
+        log.info("Sending to financial manager basket_id=%s", bti.basket_id)
+        try:
+            sent = send_to_financial_manager_if_enabled(bti, sync_request=sync_request)
+        except Exception as e:  # pylint: disable=broad-except
+            log.exception("Error sending basket_id=%s [%s]", bti.basket_id, e)
+            return False
+        if not sent:
+            log.error("Error sending basket_id=%s", bti.basket_id)
+        return bool(sent)
+
+    def _send_sequentially(self, btis):
+        """
+        Send the BasketTransactionIntegration objects one after another.
+        Returns the total number of objects and the number of objects sent with success.
+        """
+        total_count = 0
+        success_count = 0
+        for bti, sync_request in btis:
+            total_count += 1
+            success_count += self._send(bti, sync_request)
+        return total_count, success_count
+
+    def _send_concurrently(self, btis, workers):
+        """
+        Send the BasketTransactionIntegration objects using a pool of threads.
+        The number of pending sends is bounded, so the `btis` are consumed lazily.
+        Returns the total number of objects and the number of objects sent with success.
+        """
+        total_count = 0
+        success_count = 0
+        pending = set()
+        with DatabaseThreadPoolExecutor(max_workers=workers) as executor:
+            for bti, sync_request in btis:
+                total_count += 1
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    success_count += sum(future.result() for future in done)
+                pending.add(executor.submit(self._send, bti, sync_request))
+            done, _ = wait(pending)
+            success_count += sum(future.result() for future in done)
+        return total_count, success_count
@@ -0,0 +1,158 @@
+"""
+Instrumentation of the integration with the nau-financial-manager service.
+
+The metrics are recorded on a pluggable backend, configured by the `NAU_METRICS_BACKEND`
+setting with the dotted path of a class that implements the `increment` and `observe` methods.
+The default backend is an in-process registry that can be rendered on the Prometheus text format.
+"""
+import logging
+from threading import Lock
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_BACKEND = "nau_extensions.metrics.MetricsRegistry"
+
+# The upper bounds in seconds of the latency histograms buckets.
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_backend = None
+_backend_lock = Lock()
+
+
+class MetricsRegistry:
+    """
+    In-process registry of counters and histograms.
+    Each process has its own registry, so each one should be scraped individually.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def increment(self, name, labels, amount=1):
+        """
+        Increment the counter `name` with the `labels` dict.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels):
+        """
+        Record the `value` on the histogram `name` with the `labels` dict.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    "buckets": [0] * len(self.buckets),
+                    "sum": 0,
+                    "count": 0,
+                }
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def reset(self):
+        """
+        Discard all the recorded metrics.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """
+        Render the metrics on the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, dict(value, buckets=list(value["buckets"])))
+                for key, value in self._histograms.items()
+            )
+        lines = []
+        previous_name = None
+        for (name, labels), value in counters:
+            if name != previous_name:
+                lines.append(f"# TYPE {name} counter")
+                previous_name = name
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            if name != previous_name:
+                lines.append(f"# TYPE {name} histogram")
+                previous_name = name
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+            lines.append(
+                f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}"
+            )
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    formatted = ",".join(
+        '{}="{}"'.format(
+            key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for key, value in labels
+    )
+    return "{" + formatted + "}"
+
+
+def get_metrics_backend():
+    """
+    Get the metrics backend of this process.
+    """
+    global _backend  # pylint: disable=global-statement
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(
+                getattr(settings, "NAU_METRICS_BACKEND", DEFAULT_METRICS_BACKEND)
+            )()
+    return _backend
+
+
+@receiver(setting_changed)
+def _reset_metrics_backend(setting, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the metrics backend when the `NAU_METRICS_BACKEND` setting is changed, e.g. on tests.
+    """
+    global _backend  # pylint: disable=global-statement
+    if setting == "NAU_METRICS_BACKEND":
+        with _backend_lock:
+            _backend = None
+
+
+def increment(name, amount=1, **labels):
+    """
+    Increment a counter, an error recording the metric never breaks the caller.
+    """
+    try:
+        get_metrics_backend().increment(name, labels, amount)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception("Error incrementing the metric %s [%s]", name, e)
+
+
+def observe(name, value, **labels):
+    """
+    Record a value on a histogram, an error recording the metric never breaks the caller.
+    """
+    try:
+        get_metrics_backend().observe(name, value, labels)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception("Error observing the metric %s [%s]", name, e)
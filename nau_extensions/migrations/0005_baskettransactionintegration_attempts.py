@@ -0,0 +1,32 @@
+# Generated by Django 3.2.16 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0004_baskettransactionintegration_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='attempt_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='last_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='baskettransactionintegration',
+            index=models.Index(fields=['state', 'next_attempt_at'], name='nau_ext_bti_state_next_att_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0005_baskettransactionintegration_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='receipt_link',
+            field=models.CharField(blank=True, max_length=1024, null=True),
+        ),
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='receipt_link_fetched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0006_baskettransactionintegration_receipt_link'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='request_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+SENT_WITH_SUCCESS = "Sent with success"
+
+# Partial index of the objects pending to be sent with success, they are a small part of the
+# table and the ones queried by the retries. It isn't declared on the model, because MySQL
+# doesn't support partial indexes and it would create a full index of the table instead.
+PENDING_INDEX = models.Index(
+    fields=["created"],
+    name="nau_ext_bti_pending_idx",
+    condition=~models.Q(state=SENT_WITH_SUCCESS),
+)
+
+
+def add_pending_index(apps, schema_editor):
+    if schema_editor.connection.features.supports_partial_indexes:
+        model = apps.get_model("nau_extensions", "BasketTransactionIntegration")
+        schema_editor.add_index(model, PENDING_INDEX)
+
+
+def remove_pending_index(apps, schema_editor):
+    if schema_editor.connection.features.supports_partial_indexes:
+        model = apps.get_model("nau_extensions", "BasketTransactionIntegration")
+        schema_editor.remove_index(model, PENDING_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0007_baskettransactionintegration_request_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='baskettransactionintegration',
+            index=models.Index(fields=['state', 'created'], name='nau_ext_bti_state_created_idx'),
+        ),
+        migrations.RunPython(add_pending_index, remove_pending_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0008_baskettransactionintegration_state_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BasketTransactionIntegrationAttempt',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partner', models.CharField(max_length=32)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('request_build_duration_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('http_duration_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('error_class', models.CharField(blank=True, default='', max_length=128)),
+                ('basket_transaction_integration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='nau_extensions.baskettransactionintegration')),
+            ],
+            options={
+                'get_latest_by': 'created',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='baskettransactionintegrationattempt',
+            index=models.Index(fields=['partner', 'created'], name='nau_ext_bti_att_partner_idx'),
+        ),
+    ]
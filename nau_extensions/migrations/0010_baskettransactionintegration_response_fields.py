@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0009_baskettransactionintegrationattempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='response_status_code',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='response_transaction_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='response_error_codes',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='response_receipt_reference',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='baskettransactionintegration',
+            name='response_body',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:00
+
+import jsonfield.encoder
+import jsonfield.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0010_baskettransactionintegration_response_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BasketTransactionIntegrationArchive',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('basket_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('order_number', models.CharField(blank=True, db_index=True, default='', max_length=128)),
+                ('partner', models.CharField(blank=True, default='', max_length=32)),
+                ('state', models.CharField(max_length=255)),
+                ('request', jsonfield.fields.JSONField(dump_kwargs={'cls': jsonfield.encoder.JSONEncoder, 'separators': (',', ':')}, load_kwargs={})),
+                ('request_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('response', jsonfield.fields.JSONField(dump_kwargs={'cls': jsonfield.encoder.JSONEncoder, 'separators': (',', ':')}, load_kwargs={})),
+                ('response_status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('response_transaction_id', models.CharField(blank=True, default='', max_length=255)),
+                ('response_receipt_reference', models.CharField(blank=True, default='', max_length=255)),
+                ('created', models.DateTimeField()),
+                ('modified', models.DateTimeField()),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('receipt_link', models.CharField(blank=True, max_length=1024, null=True)),
+                ('receipt_link_fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'get_latest_by': 'created',
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0011_baskettransactionintegrationarchive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='baskettransactionintegrationattempt',
+            index=models.Index(fields=['created'], name='nau_ext_bti_att_created_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_integration_id(apps, schema_editor):
+    model = apps.get_model("nau_extensions", "BasketTransactionIntegrationAttempt")
+    model.objects.update(integration_id=models.F("basket_transaction_integration_id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0012_baskettransactionintegrationattempt_created_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='baskettransactionintegrationattempt',
+            name='basket_transaction_integration',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attempts', to='nau_extensions.baskettransactionintegration'),
+        ),
+        migrations.AddField(
+            model_name='baskettransactionintegrationattempt',
+            name='integration_id',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(copy_integration_id, migrations.RunPython.noop),
+    ]
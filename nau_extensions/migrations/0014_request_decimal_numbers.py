@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:00
+
+import decimal
+
+import jsonfield.fields
+import nau_extensions.serialization
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0013_baskettransactionintegrationattempt_integration_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='baskettransactionintegration',
+            name='request',
+            field=jsonfield.fields.JSONField(dump_kwargs={'cls': nau_extensions.serialization.DecimalJSONEncoder}, load_kwargs={'parse_float': decimal.Decimal}),
+        ),
+        migrations.AlterField(
+            model_name='baskettransactionintegrationarchive',
+            name='request',
+            field=jsonfield.fields.JSONField(dump_kwargs={'cls': nau_extensions.serialization.DecimalJSONEncoder}, load_kwargs={'parse_float': decimal.Decimal}),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nau_extensions', '0014_request_decimal_numbers'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='baskettransactionintegration',
+            old_name='response_error_codes',
+            new_name='response_error_fields',
+        ),
+    ]
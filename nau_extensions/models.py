@@ -1,7 +1,11 @@
+import math
+from decimal import Decimal
+
 from django.db import models
 from django.forms import ValidationError
 from django.utils.translation import ugettext_lazy as _
 from jsonfield import JSONField
+from nau_extensions.serialization import DecimalJSONEncoder, decode_body
 from nau_extensions.utils import get_order
 from nau_extensions.vatin import check_country_vatin
 from oscar.apps.address.abstract_models import AbstractAddress
@@ -117,17 +121,77 @@ class BasketTransactionIntegration(models.Model):
         max_length=255, default=TO_BE_SENT, blank=False, choices=state_choices
     )
 
-    # the request information that will be send to the nau-financial-manager
-    request = JSONField()
+    # the request information that will be send to the nau-financial-manager, with its decimals
+    # kept as numbers, so it's encoded to the same body after being loaded
+    request = JSONField(dump_kwargs={"cls": DecimalJSONEncoder}, load_kwargs={"parse_float": Decimal})
+
+    # the content hash of the request, to only save the request when it has changed
+    request_hash = models.CharField(max_length=64, blank=True, default="")
 
-    # the response that we receive from the nau-financial-manager
+    # the response that we received from the nau-financial-manager, only on the objects
+    # that haven't been sent since the `response_*` fields were added
     response = JSONField()
 
+    # the status code of the last response of the nau-financial-manager
+    response_status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    # the transaction id on the last response of the nau-financial-manager
+    response_transaction_id = models.CharField(max_length=255, blank=True, default="")
+
+    # the fields with errors on the last response, separated by commas
+    response_error_fields = models.CharField(max_length=255, blank=True, default="")
+
+    # the receipt reference on the last response of the nau-financial-manager
+    response_receipt_reference = models.CharField(max_length=255, blank=True, default="")
+
+    # the body of the last response, only kept when it's an error, capped and optionally
+    # compressed, see `serialization.decode_body`
+    response_body = models.BinaryField(null=True, blank=True)
+
     created = models.DateTimeField(auto_now_add=True, db_index=True)
     modified = models.DateTimeField(auto_now=True)
 
+    # the number of times that it has been sent to the nau-financial-manager
+    attempt_count = models.PositiveIntegerField(default=0)
+
+    # when it was sent the last time to the nau-financial-manager
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    # when it should be retried, empty if it doesn't need to be retried or if it should be
+    # sent as soon as possible
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    # the receipt link issued by the nau-financial-manager
+    receipt_link = models.CharField(max_length=1024, null=True, blank=True)
+
+    # when the receipt link has been received from the nau-financial-manager
+    receipt_link_fetched_at = models.DateTimeField(null=True, blank=True)
+
+    # the seconds spent building the request data on this process, it isn't persisted
+    request_build_duration = None
+    # the request data encoded as the HTTP body, it isn't persisted
+    request_body = None
+
     class Meta:
         get_latest_by = "created"
+        indexes = [
+            models.Index(
+                fields=["state", "next_attempt_at"], name="nau_ext_bti_state_next_att_idx"
+            ),
+            models.Index(fields=["state", "created"], name="nau_ext_bti_state_created_idx"),
+        ]
+        # On databases that support partial indexes, there is also an index of the
+        # `created` field of only the objects that haven't been sent with success,
+        # see the migration `0008_baskettransactionintegration_state_indexes`.
+
+    @property
+    def response_data(self):
+        """
+        The body of the last response, parsed as JSON when possible.
+        """
+        if self.response_body is None:
+            return self.response
+        return decode_body(self.response_body)
 
     @classmethod
     def create(cls, basket):
@@ -162,3 +226,151 @@ class BasketTransactionIntegration(models.Model):
         success to Financial Manager.
         """
         return self.state == BasketTransactionIntegration.SENT_WITH_SUCCESS
+
+
+class BasketTransactionIntegrationAttempt(models.Model):
+    """
+    Append-only log of each attempt of sending a `BasketTransactionIntegration` to the
+    nau-financial-manager, to measure the time spent building its request data and the
+    latency of the nau-financial-manager.
+    """
+
+    # empty after its basket transaction integration is archived
+    basket_transaction_integration = models.ForeignKey(
+        BasketTransactionIntegration,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="attempts",
+    )
+
+    # the id of the basket transaction integration, kept after it is archived, so the attempts of
+    # an archived object can still be found by the id of the `BasketTransactionIntegrationArchive`
+    integration_id = models.IntegerField(null=True, blank=True, db_index=True)
+
+    # the partner short code, so the attempts can be aggregated by partner without joins
+    partner = models.CharField(max_length=32)
+
+    created = models.DateTimeField(auto_now_add=True)
+
+    # the milliseconds spent building the request data, empty if it was built before
+    request_build_duration_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    # the milliseconds waiting for the nau-financial-manager response
+    http_duration_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    # the HTTP status code of the response, empty if there wasn't a response
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    # the class name of the error when there wasn't a response
+    error_class = models.CharField(max_length=128, blank=True, default="")
+
+    class Meta:
+        get_latest_by = "created"
+        indexes = [
+            models.Index(fields=["partner", "created"], name="nau_ext_bti_att_partner_idx"),
+            models.Index(fields=["created"], name="nau_ext_bti_att_created_idx"),
+        ]
+
+    @classmethod
+    def get_latency_percentiles(cls, since, percentiles=(50, 95, 99)) -> list:
+        """
+        Get the percentiles of the request build duration and of the HTTP duration of the
+        attempts of each partner created `since` a datetime.
+        The durations of the window are read with a single query and the nearest-rank
+        percentiles are computed in Python.
+        Returns a row for each partner with its number of attempts on `count` and the list of
+        percentiles on `request_build_duration_ms` and `http_duration_ms`.
+        """
+        fields = ("request_build_duration_ms", "http_duration_ms")
+        durations = {}
+        counts = {}
+        for partner, *values in cls.objects.filter(created__gte=since).values_list("partner", *fields):
+            counts[partner] = counts.get(partner, 0) + 1
+            partner_durations = durations.setdefault(partner, {field: [] for field in fields})
+            for field, value in zip(fields, values):
+                if value is not None:
+                    partner_durations[field].append(value)
+
+        result = []
+        for partner in sorted(counts):
+            row = {"partner": partner, "count": counts[partner]}
+            for field in fields:
+                values = sorted(durations[partner][field])
+                row[field] = [
+                    values[max(math.ceil(percentile / 100 * len(values)) - 1, 0)] if values else None
+                    for percentile in percentiles
+                ]
+            result.append(row)
+        return result
+
+
+class BasketTransactionIntegrationArchive(models.Model):
+    """
+    The `BasketTransactionIntegration` objects sent with success a long time ago, moved by the
+    `archive_basket_transaction_integrations` command so the live table stays small.
+    The basket is only referenced by its id, because it may have been deleted meanwhile.
+    """
+
+    # the fields copied from each `BasketTransactionIntegration`
+    COPIED_FIELDS = (
+        "id",
+        "basket_id",
+        "state",
+        "request",
+        "request_hash",
+        "response",
+        "response_status_code",
+        "response_transaction_id",
+        "response_receipt_reference",
+        "created",
+        "modified",
+        "attempt_count",
+        "last_attempt_at",
+        "receipt_link",
+        "receipt_link_fetched_at",
+    )
+
+    # the id of the archived `BasketTransactionIntegration`
+    id = models.IntegerField(primary_key=True)
+
+    basket_id = models.IntegerField(null=True, blank=True, db_index=True)
+
+    # the order number, so the archived objects can be searched without joins
+    order_number = models.CharField(max_length=128, blank=True, default="", db_index=True)
+
+    # the partner short code
+    partner = models.CharField(max_length=32, blank=True, default="")
+
+    state = models.CharField(max_length=255)
+
+    request = JSONField(dump_kwargs={"cls": DecimalJSONEncoder}, load_kwargs={"parse_float": Decimal})
+
+    request_hash = models.CharField(max_length=64, blank=True, default="")
+
+    # the legacy response, see `BasketTransactionIntegration.response`
+    response = JSONField()
+
+    response_status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    response_transaction_id = models.CharField(max_length=255, blank=True, default="")
+
+    response_receipt_reference = models.CharField(max_length=255, blank=True, default="")
+
+    created = models.DateTimeField()
+
+    modified = models.DateTimeField()
+
+    attempt_count = models.PositiveIntegerField(default=0)
+
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    receipt_link = models.CharField(max_length=1024, null=True, blank=True)
+
+    receipt_link_fetched_at = models.DateTimeField(null=True, blank=True)
+
+    # when it was archived
+    archived = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        get_latest_by = "created"
@@ -0,0 +1,83 @@
+"""
+JSON serialization of the data sent to the nau-financial-manager.
+
+The data is encoded once to compact and canonical UTF-8 bytes, used both to compute its
+content hash and as the HTTP body. The `Decimal` values are encoded as exact JSON numbers,
+the request data is saved on a `JSONField` with the same encoding and loaded with its numbers as
+`Decimal`, so the data is encoded to the same bytes whether it has just been built or loaded
+from the database. The `orjson` package is used when it's installed, otherwise `simplejson`.
+
+The responses of the nau-financial-manager are kept as bytes, optionally compressed with gzip,
+which is detected by its magic number, because a JSON or text body can't start with it.
+"""
+import gzip
+import json
+from decimal import Decimal
+
+import simplejson
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# `orjson.Fragment`, to encode a `Decimal` as a raw number, requires orjson 3.9
+if orjson is not None and not hasattr(orjson, "Fragment"):  # pragma: no cover
+    orjson = None
+
+GZIP_MAGIC_NUMBER = b"\x1f\x8b"
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return orjson.Fragment(str(value))
+    return DjangoJSONEncoder().default(value)
+
+
+def encode_json(data) -> bytes:
+    """
+    Encode the `data` to compact JSON bytes, with the keys sorted and the decimals as numbers.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SORT_KEYS)
+    return simplejson.dumps(
+        data,
+        default=DjangoJSONEncoder().default,
+        use_decimal=True,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+class DecimalJSONEncoder(json.JSONEncoder):
+    """
+    Encoder of a `JSONField` that keeps the decimals as numbers, using `encode_json`.
+    Use it with `load_kwargs={"parse_float": Decimal}` so the numbers are loaded as `Decimal`.
+    """
+
+    def encode(self, o):
+        return encode_json(o).decode("utf-8")
+
+
+def compress(body: bytes) -> bytes:
+    """
+    Compress an HTTP body with gzip.
+    """
+    return gzip.compress(body, compresslevel=6)
+
+
+def decode_body(body: bytes):
+    """
+    Decode a body kept by `compress` or not, parsed as JSON when possible, otherwise as text,
+    e.g. when it has been truncated.
+    """
+    body = bytes(body)
+    if body[:2] == GZIP_MAGIC_NUMBER:
+        body = gzip.decompress(body)
+    text = body.decode("utf-8", errors="replace")
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
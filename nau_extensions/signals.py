@@ -2,8 +2,9 @@ import re
 
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
-from nau_extensions.financial_manager import \
-    send_to_financial_manager_if_enabled
+from nau_extensions.financial_manager import (
+    is_financial_manager_enabled, is_financial_manager_outbox_enabled,
+    send_to_financial_manager_if_enabled, sync_request_data)
 from nau_extensions.models import BasketTransactionIntegration
 from oscar.core.loading import get_class, get_model
 
@@ -22,11 +23,19 @@ def create_and_send_basket_transaction_integration_to_financial_manager(
     """
     Create a Basket Transaction Integration object after a checkout of an Order;
     then send that information to the nau-financial-manager service.
+
+    On outbox mode, the object is only persisted within the checkout transaction, so it is
+    visible to the `financial_manager_outbox_worker` after the transaction is committed.
     """
     bti: BasketTransactionIntegration = BasketTransactionIntegration.create(order.basket)
+    if is_financial_manager_outbox_enabled():
+        bti.save()
+        return
+    if is_financial_manager_enabled(order.basket.site):
+        # build the request before saving, so it's saved with a single insert
+        sync_request_data(bti, save=False)
     bti.save()
-    bti.refresh_from_db()
-    send_to_financial_manager_if_enabled(bti)
+    send_to_financial_manager_if_enabled(bti, sync_request=False)
 
 
 @receiver(pre_save, sender=Product)
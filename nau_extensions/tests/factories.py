@@ -3,7 +3,9 @@ from decimal import Decimal as D
 from oscar.test.factories import (Basket, create_product, create_stockrecord,
                                   get_model)
 
+from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.partner.strategy import DefaultStrategy
+from ecommerce.extensions.test.factories import create_order
 from ecommerce.tests.factories import SiteConfigurationFactory, UserFactory
 
 ProductClass = get_model("catalogue", "ProductClass")
@@ -32,6 +34,18 @@ def create_basket(
     return basket
 
 
+def create_order_with_lines(number_of_lines, owner=None, site=None, course=None):
+    """
+    Create an order with `number_of_lines` lines, each line is a different seat of the same course.
+    """
+    if course is None:
+        course = CourseFactory()
+    basket = create_basket(owner=owner, site=site, empty=True)
+    for index in range(number_of_lines):
+        basket.add_product(course.create_or_update_seat(f"seat-type-{index}", True, 10 + index))
+    return create_order(basket=basket, user=basket.owner)
+
+
 class MockResponse:
     """
     A mocked requests response.
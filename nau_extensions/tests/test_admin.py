@@ -0,0 +1,232 @@
+import mock
+from django.contrib import messages
+from django.contrib.admin.sites import AdminSite
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from nau_extensions.admin import (BasketTransactionIntegrationAdmin,
+                                  BasketTransactionIntegrationArchiveAdmin,
+                                  BasketTransactionIntegrationAttemptAdmin)
+from nau_extensions.models import (BasketTransactionIntegration,
+                                   BasketTransactionIntegrationArchive,
+                                   BasketTransactionIntegrationAttempt)
+
+from ecommerce.extensions.test.factories import create_order
+from ecommerce.tests.testcases import TestCase
+
+
+class BasketTransactionIntegrationAdminNAUExtensionsTests(TestCase):
+    """
+    Test the admin of the Basket Transaction Integration.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.model_admin = BasketTransactionIntegrationAdmin(BasketTransactionIntegration, AdminSite())
+        self.orders = [create_order() for _ in range(3)]
+        self.btis = []
+        for order in self.orders:
+            bti = BasketTransactionIntegration.create(order.basket)
+            bti.save()
+            self.btis.append(bti)
+
+    def _search(self, search_term):
+        request = RequestFactory().get("/")
+        queryset, may_have_duplicates = self.model_admin.get_search_results(
+            request, BasketTransactionIntegration.objects.all(), search_term
+        )
+        self.assertFalse(may_have_duplicates)
+        return list(queryset)
+
+    def test_get_queryset(self):
+        """
+        Test that the payloads are deferred only on the changelist, also for a request that
+        hasn't been resolved or whose url hasn't a name.
+        """
+        request = RequestFactory().get("/")
+        self.assertEqual(self.model_admin.get_queryset(request).query.deferred_loading[0], set())
+        request.resolver_match = mock.Mock(url_name=None)
+        self.assertEqual(self.model_admin.get_queryset(request).query.deferred_loading[0], set())
+        request.resolver_match = mock.Mock(url_name="nau_extensions_baskettransactionintegration_changelist")
+        self.assertEqual(
+            self.model_admin.get_queryset(request).query.deferred_loading[0],
+            {"request", "response", "response_body"},
+        )
+
+    def test_search_by_basket_id(self):
+        """
+        Test the search by the basket id.
+        """
+        self.assertEqual(self._search(str(self.orders[1].basket_id)), [self.btis[1]])
+
+    def test_search_by_order_number(self):
+        """
+        Test the search by the order number.
+        """
+        self.assertEqual(self._search(f" {self.orders[2].number} "), [self.btis[2]])
+
+    def test_search_by_email(self):
+        """
+        Test the search by the email of the basket owner.
+        """
+        self.assertEqual(self._search(self.orders[0].basket.owner.email), [self.btis[0]])
+
+    def test_search_empty(self):
+        """
+        Test that an empty search returns every object.
+        """
+        self.assertEqual(len(self._search("")), 3)
+
+    def test_search_not_found(self):
+        """
+        Test a search that doesn't match any object.
+        """
+        self.assertEqual(self._search("unknown"), [])
+
+    @override_settings(NAU_ADMIN_PAYLOAD_MAX_LENGTH=20)
+    def test_formatted_request_truncated(self):
+        """
+        Test that a large request is truncated.
+        """
+        bti = self.btis[0]
+        bti.request = {"items": ["a" * 100]}
+        formatted = self.model_admin.formatted_request(bti)
+        self.assertIn("<details>", formatted)
+        self.assertNotIn("a" * 100, formatted)
+
+    def test_formatted_response_escaped(self):
+        """
+        Test that a small response is fully rendered and escaped.
+        """
+        bti = self.btis[0]
+        bti.response = {"message": "<script>"}
+        formatted = self.model_admin.formatted_response(bti)
+        self.assertNotIn("<details>", formatted)
+        self.assertIn("&lt;script&gt;", formatted)
+
+    def _retry_send(self, queryset):
+        with mock.patch.object(self.model_admin, "message_user") as message_user_mock:
+            self.model_admin.retry_send_to_financial_manager(RequestFactory().get("/"), queryset)
+        message_user_mock.assert_called_once()
+        return message_user_mock.call_args[0][1:]
+
+    @mock.patch("nau_extensions.admin.send_to_financial_manager_if_enabled")
+    def test_retry_send_to_financial_manager(self, send_mock):
+        """
+        Test that the retry action skips the objects already sent with success and returns
+        a single summary message.
+        """
+        send_mock.side_effect = lambda bti, sync_request: bti.id != self.btis[2].id
+        BasketTransactionIntegration.objects.filter(id=self.btis[0].id).update(
+            state=BasketTransactionIntegration.SENT_WITH_SUCCESS
+        )
+
+        message, level = self._retry_send(BasketTransactionIntegration.objects.all())
+
+        self.assertEqual(send_mock.call_count, 2)
+        self.assertNotIn(self.btis[0].id, [call[0][0].id for call in send_mock.call_args_list])
+        self.assertEqual(message, "Sent 1, failed 1, skipped 1 already sent.")
+        self.assertEqual(level, messages.ERROR)
+
+    @mock.patch("nau_extensions.admin.send_to_financial_manager_if_enabled", return_value=True)
+    def test_retry_send_to_financial_manager_success(self, send_mock):
+        """
+        Test the summary message when every object is sent with success.
+        """
+        message, level = self._retry_send(BasketTransactionIntegration.objects.all())
+
+        self.assertEqual(send_mock.call_count, 3)
+        self.assertEqual(message, "Sent 3, failed 0, skipped 0 already sent.")
+        self.assertEqual(level, messages.SUCCESS)
+
+    @mock.patch("nau_extensions.admin.is_financial_manager_enabled", return_value=True)
+    @mock.patch("nau_extensions.admin.sync_request_data_bulk")
+    @mock.patch("nau_extensions.admin.send_to_financial_manager_if_enabled", return_value=True)
+    def test_retry_send_to_financial_manager_sync_bulk(self, send_mock, sync_bulk_mock, _enabled_mock):
+        """
+        Test that the request data is synchronized in bulk before sending, and that each object
+        is synchronized when it's sent only if the bulk synchronization fails.
+        """
+        self._retry_send(BasketTransactionIntegration.objects.all())
+        self.assertEqual(
+            sorted(bti.id for bti in sync_bulk_mock.call_args[0][0]), [bti.id for bti in self.btis]
+        )
+        self.assertEqual({call[1]["sync_request"] for call in send_mock.call_args_list}, {False})
+
+        sync_bulk_mock.side_effect = Exception("Boom")
+        send_mock.reset_mock()
+        self._retry_send(BasketTransactionIntegration.objects.all())
+        self.assertEqual({call[1]["sync_request"] for call in send_mock.call_args_list}, {True})
+
+    @override_settings(NAU_FINANCIAL_MANAGER_OUTBOX=True, NAU_ADMIN_RETRY_ENQUEUE_THRESHOLD=1)
+    @mock.patch("nau_extensions.admin.send_to_financial_manager_if_enabled")
+    def test_retry_send_to_financial_manager_enqueued(self, send_mock):
+        """
+        Test that a large selection is enqueued to the outbox worker when the outbox is enabled.
+        """
+        BasketTransactionIntegration.objects.update(
+            state=BasketTransactionIntegration.SENT_WITH_ERROR
+        )
+
+        message, level = self._retry_send(BasketTransactionIntegration.objects.all())
+
+        send_mock.assert_not_called()
+        self.assertEqual(message, "Enqueued 3, skipped 0 already sent.")
+        self.assertEqual(level, messages.SUCCESS)
+        self.assertEqual(
+            BasketTransactionIntegration.objects.filter(
+                state=BasketTransactionIntegration.TO_BE_SENT
+            ).count(),
+            3,
+        )
+
+
+class BasketTransactionIntegrationAttemptAdminNAUExtensionsTests(TestCase):
+    """
+    Test the admin of the attempts log.
+    """
+
+    def test_get_window_hours(self):
+        """
+        Test that the `window_hours` parameter is limited and that the invalid values are ignored.
+        """
+        model_admin = BasketTransactionIntegrationAttemptAdmin(BasketTransactionIntegrationAttempt, AdminSite())
+        for value, expected in (("48", 48), ("0", 1), ("999999999999", 720), ("abc", 24)):
+            request = RequestFactory().get("/", {"window_hours": value})
+            self.assertEqual(model_admin.get_window_hours(request), expected)
+        self.assertEqual(model_admin.get_window_hours(RequestFactory().get("/")), 24)
+
+
+class BasketTransactionIntegrationArchiveAdminNAUExtensionsTests(TestCase):
+    """
+    Test the admin of the archived Basket Transaction Integrations.
+    """
+
+    def test_search_by_order_number(self):
+        """
+        Test the search of the archived objects by the order number and by the basket id.
+        """
+        model_admin = BasketTransactionIntegrationArchiveAdmin(BasketTransactionIntegrationArchive, AdminSite())
+        now = timezone.now()
+        archived = [
+            BasketTransactionIntegrationArchive.objects.create(
+                id=index, basket_id=index, order_number=f"EDX-10000{index}", state="Sent with success",
+                request={}, created=now, modified=now,
+            )
+            for index in (1, 2)
+        ]
+        request = RequestFactory().get("/")
+        queryset = BasketTransactionIntegrationArchive.objects.all()
+        self.assertEqual(list(model_admin.get_search_results(request, queryset, "EDX-100002")[0]), [archived[1]])
+        self.assertEqual(list(model_admin.get_search_results(request, queryset, "1")[0]), [archived[0]])
+
+    def test_get_queryset(self):
+        """
+        Test that the payloads are deferred only on the changelist, also for a request whose url
+        hasn't a name.
+        """
+        model_admin = BasketTransactionIntegrationArchiveAdmin(BasketTransactionIntegrationArchive, AdminSite())
+        request = RequestFactory().get("/")
+        request.resolver_match = mock.Mock(url_name=None)
+        self.assertEqual(model_admin.get_queryset(request).query.deferred_loading[0], set())
+        request.resolver_match = mock.Mock(url_name="nau_extensions_baskettransactionintegrationarchive_changelist")
+        self.assertEqual(model_admin.get_queryset(request).query.deferred_loading[0], {"request", "response"})
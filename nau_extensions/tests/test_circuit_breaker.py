@@ -0,0 +1,73 @@
+import mock
+from django.core.cache import cache
+from nau_extensions.circuit_breaker import CircuitBreaker
+
+from ecommerce.tests.testcases import TestCase
+
+
+class CircuitBreakerNAUExtensionsTests(TestCase):
+    """
+    Test the circuit breaker backed by the Django cache.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_circuit_breaker_opens_after_threshold(self):
+        """
+        Test that the circuit opens after the consecutive failures threshold.
+        """
+        breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=60)
+        for _ in range(2):
+            breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+        self.assertFalse(breaker.allow_request())
+
+    def test_circuit_breaker_success_resets_failures(self):
+        """
+        Test that a success resets the consecutive failures count.
+        """
+        breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+
+    @mock.patch("nau_extensions.circuit_breaker.time.time")
+    def test_circuit_breaker_half_open_single_probe(self, mock_time):
+        """
+        Test that after the recovery timeout a single probe is allowed and that a successful
+        probe closes the circuit.
+        """
+        mock_time.return_value = 1000
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+
+        mock_time.return_value = 1061
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.allow_request())
+
+    @mock.patch("nau_extensions.circuit_breaker.time.time")
+    def test_circuit_breaker_failed_probe_reopens(self, mock_time):
+        """
+        Test that a failed probe keeps the circuit open for another recovery timeout.
+        """
+        mock_time.return_value = 1000
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60)
+        breaker.record_failure()
+
+        mock_time.return_value = 1061
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+
+        mock_time.return_value = 1122
+        self.assertTrue(breaker.allow_request())
@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from nau_extensions.financial_manager import get_receipt_link
+from nau_extensions.models import (BasketTransactionIntegration,
+                                   BasketTransactionIntegrationArchive,
+                                   BasketTransactionIntegrationAttempt)
+from nau_extensions.tests.factories import create_basket
+from nau_extensions.utils import get_order
+
+from ecommerce.extensions.test.factories import create_order
+from ecommerce.tests.factories import (PartnerFactory,
+                                       SiteConfigurationFactory, UserFactory)
+from ecommerce.tests.testcases import TestCase
+
+
+class ArchiveBasketTransactionIntegrationsCommandNAUExtensionsTests(TestCase):
+    """
+    Test the command that archives the old Basket Transaction Integrations.
+    """
+
+    def _create_basket_transaction_integration(self, state, days_ago):
+        partner = PartnerFactory(short_code="edX")
+        site = SiteConfigurationFactory(partner=partner).site
+        basket = create_basket(owner=UserFactory(), site=site)
+        order = create_order(basket=basket)
+        bti = BasketTransactionIntegration.create(basket)
+        bti.state = state
+        bti.request = {"transaction_id": order.number}
+        bti.receipt_link = f"https://example.com/{order.number}.pdf"
+        bti.save()
+        BasketTransactionIntegration.objects.filter(id=bti.id).update(
+            created=timezone.now() - timedelta(days=days_ago)
+        )
+        return bti
+
+    def test_archive(self):
+        """
+        Test that only the old objects sent with success are moved to the archive, on chunks.
+        """
+        old = [
+            self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS, 400)
+            for _ in range(3)
+        ]
+        recent = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS, 10)
+        error = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_ERROR, 400)
+
+        call_command("archive_basket_transaction_integrations", chunk_size=2, sleep=0)
+
+        self.assertEqual(
+            set(BasketTransactionIntegration.objects.values_list("id", flat=True)), {recent.id, error.id}
+        )
+        archived = BasketTransactionIntegrationArchive.objects.get(id=old[0].id)
+        self.assertEqual(archived.basket_id, old[0].basket_id)
+        self.assertEqual(archived.order_number, old[0].basket.order_number)
+        self.assertEqual(archived.partner, "edX")
+        self.assertEqual(archived.request, {"transaction_id": old[0].basket.order_number})
+        self.assertEqual(BasketTransactionIntegrationArchive.objects.count(), 3)
+
+    def test_archive_keeps_attempts(self):
+        """
+        Test that the attempts of an archived object are kept, with the id of the archived object.
+        """
+        bti = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS, 400)
+        attempt = BasketTransactionIntegrationAttempt.objects.create(
+            basket_transaction_integration=bti,
+            integration_id=bti.id,
+            partner="edx",
+            http_duration_ms=100,
+            status_code=201,
+        )
+
+        call_command("archive_basket_transaction_integrations", sleep=0)
+
+        self.assertTrue(BasketTransactionIntegrationArchive.objects.filter(id=bti.id).exists())
+        attempt.refresh_from_db()
+        self.assertIsNone(attempt.basket_transaction_integration_id)
+        self.assertEqual(attempt.integration_id, bti.id)
+        self.assertEqual(attempt.http_duration_ms, 100)
+
+    def test_archive_days_limit_and_dry_run(self):
+        """
+        Test the `days`, `limit` and `dry_run` arguments.
+        """
+        for _ in range(3):
+            self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS, 10)
+
+        call_command("archive_basket_transaction_integrations", days=5, dry_run=True)
+        self.assertEqual(BasketTransactionIntegrationArchive.objects.count(), 0)
+
+        call_command("archive_basket_transaction_integrations", days=5, limit=2, sleep=0)
+        self.assertEqual(BasketTransactionIntegrationArchive.objects.count(), 2)
+        self.assertEqual(BasketTransactionIntegration.objects.count(), 1)
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "receipt-link-url": "https://finacial-manager.example.com/api/billing/receipt-link/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    def test_receipt_link_of_archived(self):
+        """
+        Test that the receipt link of an archived object is still read without calling the
+        financial manager.
+        """
+        bti = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS, 400)
+        call_command("archive_basket_transaction_integrations", sleep=0)
+        self.assertEqual(get_receipt_link(get_order(bti.basket)), bti.receipt_link)
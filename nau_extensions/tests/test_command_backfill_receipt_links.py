@@ -0,0 +1,61 @@
+import mock
+from django.core.management import call_command
+from nau_extensions.models import BasketTransactionIntegration
+
+from ecommerce.extensions.test.factories import create_order
+from ecommerce.tests.testcases import TestCase
+
+
+@mock.patch(
+    "nau_extensions.management.commands.backfill_receipt_links.is_financial_manager_enabled",
+    return_value=True,
+)
+@mock.patch(
+    "nau_extensions.management.commands.backfill_receipt_links.fetch_receipt_link"
+)
+class BackfillReceiptLinksCommandNAUExtensionsTests(TestCase):
+    """
+    Test the command that fills the receipt links.
+    """
+
+    def _create_basket_transaction_integration(self, state, receipt_link=None):
+        order = create_order()
+        bti = BasketTransactionIntegration.create(order.basket)
+        bti.state = state
+        bti.receipt_link = receipt_link
+        bti.save()
+        return bti
+
+    def test_backfill_receipt_links(self, fetch_mock, _enabled_mock):
+        """
+        Test that only the objects sent with success and without receipt link are filled.
+        """
+        fetch_mock.side_effect = lambda site, transaction_id: f"https://example.com/{transaction_id}.pdf"
+        btis = [
+            self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS)
+            for _ in range(5)
+        ]
+        self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_ERROR)
+        self._create_basket_transaction_integration(
+            BasketTransactionIntegration.SENT_WITH_SUCCESS, receipt_link="https://example.com/existing.pdf"
+        )
+
+        call_command("backfill_receipt_links", batch_size=2, workers=2)
+
+        self.assertEqual(fetch_mock.call_count, 5)
+        for bti in btis:
+            bti.refresh_from_db()
+            self.assertEqual(bti.receipt_link, f"https://example.com/{bti.basket.order_number}.pdf")
+            self.assertIsNotNone(bti.receipt_link_fetched_at)
+
+    def test_backfill_receipt_links_not_available(self, fetch_mock, _enabled_mock):
+        """
+        Test that the objects whose receipt link isn't available yet are kept empty.
+        """
+        fetch_mock.return_value = None
+        bti = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS)
+
+        call_command("backfill_receipt_links")
+
+        bti.refresh_from_db()
+        self.assertIsNone(bti.receipt_link)
@@ -0,0 +1,119 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+from nau_extensions.models import BasketTransactionIntegration
+from nau_extensions.serialization import compress, encode_json
+from nau_extensions.tests.factories import create_basket
+
+from ecommerce.extensions.test.factories import create_order
+from ecommerce.tests.factories import (PartnerFactory,
+                                       SiteConfigurationFactory, UserFactory)
+from ecommerce.tests.testcases import TestCase
+
+
+class ExportBasketTransactionIntegrationsCommandNAUExtensionsTests(TestCase):
+    """
+    Test the command that exports the Basket Transaction Integrations.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+
+    def _create_basket_transaction_integration(self, state, partner_short_code="edX", created=None):
+        partner = PartnerFactory(short_code=partner_short_code)
+        site = SiteConfigurationFactory(partner=partner).site
+        basket = create_basket(owner=UserFactory(), site=site)
+        create_order(basket=basket)
+        bti = BasketTransactionIntegration.create(basket)
+        bti.state = state
+        bti.request = {
+            "transaction_id": basket.order_number,
+            "total_amount_include_vat": "10.00",
+            "total_discount_incl_tax": "0.00",
+            "currency": "EUR",
+        }
+        bti.response_transaction_id = basket.order_number
+        if state == BasketTransactionIntegration.SENT_WITH_ERROR:
+            bti.response_status_code = 400
+            bti.response_body = compress(encode_json({"transaction_id": basket.order_number}))
+        else:
+            bti.response_status_code = 201
+        bti.save()
+        if created:
+            BasketTransactionIntegration.objects.filter(id=bti.id).update(created=created)
+        return bti
+
+    def _export(self, file_name, **kwargs):
+        output = os.path.join(self.directory.name, file_name)
+        call_command("export_basket_transaction_integrations", output=output, **kwargs)
+        return output
+
+    def test_export_csv(self):
+        """
+        Test the export as CSV, reading the objects on multiple chunks.
+        """
+        btis = [
+            self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS)
+            for _ in range(3)
+        ]
+
+        with open(self._export("export.csv", chunk_size=2), encoding="utf-8") as output:
+            rows = list(csv.DictReader(output))
+
+        self.assertEqual([int(row["id"]) for row in rows], [bti.id for bti in btis])
+        self.assertEqual(rows[0]["transaction_id"], btis[0].basket.order_number)
+        self.assertEqual(rows[0]["partner"], "edX")
+        self.assertEqual(rows[0]["state"], BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        self.assertEqual(rows[0]["total_amount_include_vat"], "10.00")
+        self.assertEqual(rows[0]["response_status_code"], "201")
+        self.assertEqual(rows[0]["response_transaction_id"], btis[0].basket.order_number)
+        self.assertEqual(rows[0]["response"], "")
+
+    def test_export_jsonl_gzip(self):
+        """
+        Test the export as compressed JSON Lines.
+        """
+        bti = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_ERROR)
+
+        with gzip.open(self._export("export.jsonl.gz", format="jsonl"), "rt", encoding="utf-8") as output:
+            rows = [json.loads(line) for line in output]
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], bti.id)
+        self.assertEqual(rows[0]["currency"], "EUR")
+        self.assertEqual(rows[0]["response"], {"transaction_id": bti.basket.order_number})
+
+    def test_export_filters(self):
+        """
+        Test the filters by date range, state and partner.
+        """
+        now = timezone.now()
+        expected = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_ERROR)
+        self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        self._create_basket_transaction_integration(
+            BasketTransactionIntegration.SENT_WITH_ERROR, partner_short_code="other"
+        )
+        self._create_basket_transaction_integration(
+            BasketTransactionIntegration.SENT_WITH_ERROR, created=now - timedelta(days=40)
+        )
+
+        output = self._export(
+            "export.jsonl",
+            format="jsonl",
+            start_date=(now - timedelta(days=1)).date(),
+            end_date=now.date(),
+            state=[BasketTransactionIntegration.SENT_WITH_ERROR],
+            partner="EDX",
+        )
+        with open(output, encoding="utf-8") as output_file:
+            rows = [json.loads(line) for line in output_file]
+
+        self.assertEqual([row["id"] for row in rows], [expected.id])
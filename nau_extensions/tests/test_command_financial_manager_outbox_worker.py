@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+import mock
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from nau_extensions.models import BasketTransactionIntegration
+from nau_extensions.tests.factories import create_basket
+
+from ecommerce.extensions.test.factories import create_order
+from ecommerce.tests.factories import (PartnerFactory,
+                                       SiteConfigurationFactory, UserFactory)
+from ecommerce.tests.testcases import TestCase
+
+
+@override_settings(
+    NAU_FINANCIAL_MANAGER={
+        "edx": {
+            "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+            "token": "a-very-long-token",
+        },
+    },
+)
+@mock.patch(
+    "nau_extensions.management.commands.financial_manager_outbox_worker.send_to_financial_manager_if_enabled"
+)
+class OutboxWorkerCommandNAUExtensionsTests(TestCase):
+    """
+    Test the financial manager outbox worker command.
+    """
+
+    def _create_basket_transaction_integration(self, state=None, partner_short_code="edX"):
+        partner = PartnerFactory(short_code=partner_short_code)
+        site = SiteConfigurationFactory(partner=partner).site
+        basket = create_basket(owner=UserFactory(), site=site)
+        create_order(basket=basket)
+        bti = BasketTransactionIntegration.create(basket)
+        if state:
+            bti.state = state
+        bti.save()
+        return bti
+
+    def test_outbox_worker_sends_only_pending(self, send_mock):
+        """
+        Test that the worker only sends the objects on the `To be sent` state.
+        """
+        self._create_basket_transaction_integration(
+            state=BasketTransactionIntegration.SENT_WITH_SUCCESS
+        )
+        self._create_basket_transaction_integration(
+            state=BasketTransactionIntegration.SENT_WITH_ERROR
+        )
+        bti_pending = self._create_basket_transaction_integration()
+
+        call_command("financial_manager_outbox_worker", once=True)
+        send_mock.assert_called_once_with(bti_pending)
+
+    def test_outbox_worker_skips_disabled_partners(self, send_mock):
+        """
+        Test that the objects of a partner without the financial manager setting aren't picked.
+        """
+        self._create_basket_transaction_integration(partner_short_code="other")
+        call_command("financial_manager_outbox_worker", once=True)
+        send_mock.assert_not_called()
+
+    def test_outbox_worker_skips_claimed(self, send_mock):
+        """
+        Test that an object claimed by a worker isn't picked again until its claim expires.
+        """
+        bti = self._create_basket_transaction_integration()
+        call_command("financial_manager_outbox_worker", once=True)
+        call_command("financial_manager_outbox_worker", once=True)
+        send_mock.assert_called_once()
+
+        BasketTransactionIntegration.objects.filter(id=bti.id).update(next_attempt_at=timezone.now())
+        call_command("financial_manager_outbox_worker", once=True)
+        self.assertEqual(send_mock.call_count, 2)
+
+    def test_outbox_worker_batch_size(self, send_mock):
+        """
+        Test that a single pass of the worker sends at most `batch_size` objects.
+        """
+        for _ in range(5):
+            self._create_basket_transaction_integration()
+        call_command("financial_manager_outbox_worker", once=True, batch_size=3)
+        self.assertEqual(send_mock.call_count, 3)
+
+    def test_outbox_worker_continues_after_error(self, send_mock):
+        """
+        Test that an error sending an object doesn't stop the worker, and that the object is
+        changed to `Sent with error` so it's retried with a backoff.
+        """
+        send_mock.side_effect = [Exception("Boom"), True]
+        btis = [self._create_basket_transaction_integration() for _ in range(2)]
+        call_command("financial_manager_outbox_worker", once=True)
+        self.assertEqual(send_mock.call_count, 2)
+
+        btis[0].refresh_from_db()
+        self.assertEqual(btis[0].state, BasketTransactionIntegration.SENT_WITH_ERROR)
+        self.assertGreater(btis[0].next_attempt_at, timezone.now())
+
+    @override_settings(NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_SECONDS=60, NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_JITTER=0)
+    def test_outbox_worker_error_backoff(self, send_mock):
+        """
+        Test that each error sending an object counts as an attempt, so the delay until it's
+        retried grows.
+        """
+        send_mock.side_effect = Exception("Boom")
+        bti = self._create_basket_transaction_integration()
+
+        delays = []
+        for _ in range(2):
+            BasketTransactionIntegration.objects.filter(id=bti.id).update(
+                state=BasketTransactionIntegration.TO_BE_SENT, next_attempt_at=None
+            )
+            before = timezone.now()
+            call_command("financial_manager_outbox_worker", once=True)
+            bti.refresh_from_db()
+            self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_ERROR)
+            delays.append(bti.next_attempt_at - before)
+
+        self.assertEqual(bti.attempt_count, 2)
+        self.assertAlmostEqual(delays[0], timedelta(seconds=60), delta=timedelta(seconds=5))
+        self.assertAlmostEqual(delays[1], timedelta(seconds=120), delta=timedelta(seconds=5))
@@ -0,0 +1,182 @@
+from datetime import timedelta
+
+import mock
+import requests
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from nau_extensions.management.commands.reconcile_financial_manager import \
+    Command
+from nau_extensions.models import BasketTransactionIntegration
+from nau_extensions.tests.factories import MockResponse, create_basket
+
+from ecommerce.extensions.test.factories import create_order
+from ecommerce.tests.factories import (PartnerFactory,
+                                       SiteConfigurationFactory, UserFactory)
+from ecommerce.tests.testcases import TestCase
+
+
+@mock.patch(
+    "nau_extensions.management.commands.reconcile_financial_manager.is_financial_manager_enabled",
+    return_value=True,
+)
+@mock.patch(
+    "nau_extensions.management.commands.reconcile_financial_manager.lookup_transaction"
+)
+class ReconcileFinancialManagerCommandNAUExtensionsTests(TestCase):
+    """
+    Test the command that reconciles the state with the financial manager.
+    """
+
+    def _create_basket_transaction_integration(self, state, hours_ago=48):
+        order = create_order()
+        bti = BasketTransactionIntegration.create(order.basket)
+        bti.state = state
+        bti.save()
+        BasketTransactionIntegration.objects.filter(id=bti.id).update(
+            created=timezone.now() - timedelta(hours=hours_ago)
+        )
+        bti.refresh_from_db()
+        return bti
+
+    def _lookups(self, accepted, unknown=()):
+        def lookup(site, transaction_id):  # pylint: disable=unused-argument
+            if transaction_id in unknown:
+                return None, None
+            if transaction_id in accepted:
+                return f"https://example.com/{transaction_id}.pdf", True
+            return None, False
+        return lookup
+
+    def test_reconcile(self, lookup_mock, _enabled_mock):
+        """
+        Test that the local state is changed to the state on the financial manager.
+        """
+        accepted_error = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_ERROR)
+        missing_success = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        accepted_success = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        unknown_error = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_ERROR)
+        lookup_mock.side_effect = self._lookups(
+            accepted=[accepted_error.basket.order_number, accepted_success.basket.order_number],
+            unknown=[unknown_error.basket.order_number],
+        )
+
+        call_command("reconcile_financial_manager", batch_size=3, workers=2)
+
+        self.assertEqual(lookup_mock.call_count, 4)
+        for bti in (accepted_error, missing_success, accepted_success, unknown_error):
+            bti.refresh_from_db()
+        self.assertEqual(accepted_error.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        self.assertEqual(
+            accepted_error.receipt_link, f"https://example.com/{accepted_error.basket.order_number}.pdf"
+        )
+        self.assertIsNone(accepted_error.next_attempt_at)
+        self.assertEqual(missing_success.state, BasketTransactionIntegration.SENT_WITH_ERROR)
+        self.assertEqual(accepted_success.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        self.assertIsNone(accepted_success.receipt_link)
+        self.assertEqual(unknown_error.state, BasketTransactionIntegration.SENT_WITH_ERROR)
+
+    @override_settings(NAU_FINANCIAL_MANAGER_RECONCILE_GRACE_HOURS=24)
+    def test_reconcile_grace_period(self, lookup_mock, _enabled_mock):
+        """
+        Test that the objects sent with success within the grace period are left unchanged,
+        even if the financial manager doesn't have their receipt yet.
+        """
+        recent = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS, 1)
+        retried = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        BasketTransactionIntegration.objects.filter(id=retried.id).update(last_attempt_at=timezone.now())
+        old = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        lookup_mock.side_effect = self._lookups(accepted=[])
+
+        call_command("reconcile_financial_manager")
+
+        for bti in (recent, retried, old):
+            bti.refresh_from_db()
+        self.assertEqual(recent.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        self.assertEqual(retried.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        self.assertEqual(old.state, BasketTransactionIntegration.SENT_WITH_ERROR)
+
+        call_command("reconcile_financial_manager", grace_hours=0)
+
+        recent.refresh_from_db()
+        self.assertEqual(recent.state, BasketTransactionIntegration.SENT_WITH_ERROR)
+
+    def test_reconcile_state_changed_meanwhile(self, lookup_mock, _enabled_mock):
+        """
+        Test that an object whose state has changed since it was read isn't overwritten.
+        """
+        bti = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_ERROR)
+        lookup_mock.side_effect = self._lookups(accepted=[bti.basket.order_number])
+        reconcile = Command._reconcile  # pylint: disable=protected-access
+
+        def reconcile_after_sent(command, *args):
+            # the object is sent by another process, after it has been read
+            BasketTransactionIntegration.objects.filter(id=bti.id).update(
+                state=BasketTransactionIntegration.TO_BE_SENT
+            )
+            reconcile(command, *args)
+
+        with mock.patch.object(Command, "_reconcile", autospec=True, side_effect=reconcile_after_sent):
+            call_command("reconcile_financial_manager")
+
+        bti.refresh_from_db()
+        self.assertEqual(bti.state, BasketTransactionIntegration.TO_BE_SENT)
+        self.assertIsNone(bti.receipt_link)
+
+    def test_reconcile_dry_run(self, lookup_mock, _enabled_mock):
+        """
+        Test that a dry run doesn't save the changes.
+        """
+        bti = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_ERROR)
+        lookup_mock.side_effect = self._lookups(accepted=[bti.basket.order_number])
+
+        call_command("reconcile_financial_manager", dry_run=True)
+
+        bti.refresh_from_db()
+        self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_ERROR)
+
+    def test_reconcile_state(self, lookup_mock, _enabled_mock):
+        """
+        Test that only the objects of the chosen states are reconciled.
+        """
+        self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        bti = self._create_basket_transaction_integration(BasketTransactionIntegration.SENT_WITH_ERROR)
+        lookup_mock.side_effect = self._lookups(accepted=[])
+
+        call_command("reconcile_financial_manager", state=[BasketTransactionIntegration.SENT_WITH_ERROR])
+
+        lookup_mock.assert_called_once_with(bti.basket.site, bti.basket.order_number)
+
+
+class ReconcileFinancialManagerResponsesNAUExtensionsTests(TestCase):
+    """
+    Test the reconcile command with the responses of the financial manager.
+    """
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "receipt-link-url": "https://finacial-manager.example.com/api/billing/receipt-link/",
+                "token": "an-invalid-token",
+            },
+        },
+    )
+    def test_reconcile_unauthorized(self):
+        """
+        Test that an unauthorized response is unknown, so the objects are left unchanged.
+        """
+        site = SiteConfigurationFactory(partner=PartnerFactory(short_code="edX")).site
+        basket = create_basket(owner=UserFactory(), site=site)
+        create_order(basket=basket)
+        bti = BasketTransactionIntegration.create(basket)
+        bti.state = BasketTransactionIntegration.SENT_WITH_SUCCESS
+        bti.save()
+
+        with mock.patch.object(
+            requests.Session, "get", return_value=MockResponse(json_data={"detail": "Invalid token."}, status_code=401)
+        ) as mock_get:
+            call_command("reconcile_financial_manager")
+
+        mock_get.assert_called_once()
+        bti.refresh_from_db()
+        self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
@@ -1,6 +1,9 @@
+from datetime import timedelta
+
 import mock
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.utils import timezone
 from nau_extensions.models import BasketTransactionIntegration
 
 from ecommerce.extensions.test.factories import create_order
@@ -34,7 +37,7 @@ class CommandsNAUExtensionsTests(TestCase):
         bti_pending = self._create_basket_transaction_integration()
 
         call_command("retry_send_to_financial_manager", delta_in_minutes=0)
-        send_mock.assert_called_once_with(bti_pending)
+        send_mock.assert_called_once_with(bti_pending, sync_request=False)
 
     def test_retry_send_to_financial_manager_one_each_state(self, send_mock):
         """
@@ -64,3 +67,63 @@ class CommandsNAUExtensionsTests(TestCase):
             self._create_basket_transaction_integration()
         call_command("retry_send_to_financial_manager", delta_in_minutes=0)
         self.assertEqual(send_mock.call_count, 10)
+
+    def test_retry_send_to_financial_manager_concurrent_workers(self, send_mock):
+        """
+        Test that retry sending multiple BasketTransactionIntegration objects using concurrent workers.
+        """
+        for _ in range(10):
+            self._create_basket_transaction_integration()
+        call_command("retry_send_to_financial_manager", delta_in_minutes=0, workers=4)
+        self.assertEqual(send_mock.call_count, 10)
+
+    def test_retry_send_to_financial_manager_concurrent_workers_error(self, send_mock):
+        """
+        Test that the command fails if any of the concurrent sends fails.
+        """
+        send_mock.side_effect = [True, False, Exception("Boom")]
+        for _ in range(3):
+            self._create_basket_transaction_integration()
+        with self.assertRaises(CommandError):
+            call_command("retry_send_to_financial_manager", delta_in_minutes=0, workers=2)
+        self.assertEqual(send_mock.call_count, 3)
+
+    def test_retry_send_to_financial_manager_recent_not_sent(self, send_mock):
+        """
+        Test that the BasketTransactionIntegration objects created inside the delta aren't retried.
+        """
+        for _ in range(3):
+            self._create_basket_transaction_integration()
+        call_command("retry_send_to_financial_manager", delta_in_minutes=60)
+        send_mock.assert_not_called()
+
+    def test_retry_send_to_financial_manager_chunked(self, send_mock):
+        """
+        Test that all objects are retried when they are fetched in multiple chunks.
+        """
+        for _ in range(5):
+            self._create_basket_transaction_integration()
+        call_command("retry_send_to_financial_manager", delta_in_minutes=0, chunk_size=2)
+        self.assertEqual(send_mock.call_count, 5)
+
+    def test_retry_send_to_financial_manager_only_due(self, send_mock):
+        """
+        Test that only the BasketTransactionIntegration objects whose next attempt is due are retried.
+        """
+        bti_due = self._create_basket_transaction_integration(
+            state=BasketTransactionIntegration.SENT_WITH_ERROR
+        )
+        bti_due.next_attempt_at = timezone.now() - timedelta(minutes=1)
+        bti_due.save()
+        bti_scheduled = self._create_basket_transaction_integration(
+            state=BasketTransactionIntegration.SENT_WITH_ERROR
+        )
+        bti_scheduled.next_attempt_at = timezone.now() + timedelta(hours=1)
+        bti_scheduled.save()
+
+        call_command("retry_send_to_financial_manager", delta_in_minutes=0)
+        send_mock.assert_called_once_with(bti_due, sync_request=False)
+
+        send_mock.reset_mock()
+        call_command("retry_send_to_financial_manager", delta_in_minutes=0, ignore_schedule=True)
+        self.assertEqual(send_mock.call_count, 2)
@@ -2,9 +2,15 @@ from decimal import Decimal
 
 import mock
 import requests
+from django.core.cache import cache
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from nau_extensions.financial_manager import (
-    get_receipt_link, send_to_financial_manager_if_enabled, sync_request_data)
+    get_financial_manager_client, get_next_attempt_at, get_receipt_link,
+    send_to_financial_manager_if_enabled, sync_request_data,
+    sync_request_data_bulk)
 from nau_extensions.models import (BasketBillingInformation,
                                    BasketTransactionIntegration)
 from nau_extensions.tests.factories import MockResponse, create_basket
@@ -27,6 +33,11 @@ class FinancialManagerNAUExtensionsTests(TestCase):
     # To view the full difference of the asserted dictionaries
     maxDiff = None
 
+    def setUp(self):
+        super().setUp()
+        # the receipt links and the circuit breaker state are kept on the cache
+        cache.clear()
+
     @override_settings(OSCAR_DEFAULT_CURRENCY="EUR")
     def test_financial_manager_sync_data_basic(self):
         """
@@ -453,7 +464,7 @@ class FinancialManagerNAUExtensionsTests(TestCase):
         }
 
         with mock.patch.object(
-            requests,
+            requests.Session,
             "post",
             return_value=MockResponse(
                 json_data=mock_response_json_data,
@@ -463,7 +474,8 @@ class FinancialManagerNAUExtensionsTests(TestCase):
             send_to_financial_manager_if_enabled(bti)
 
         self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
-        self.assertEqual(mock_response_json_data, bti.response)
+        self.assertEqual(bti.response_status_code, 201)
+        self.assertIsNone(bti.response_data)
 
     @override_settings(
         NAU_FINANCIAL_MANAGER={
@@ -510,7 +522,7 @@ class FinancialManagerNAUExtensionsTests(TestCase):
         }
 
         with mock.patch.object(
-            requests,
+            requests.Session,
             "post",
             return_value=MockResponse(
                 json_data=mock_response_json_data,
@@ -520,7 +532,10 @@ class FinancialManagerNAUExtensionsTests(TestCase):
             send_to_financial_manager_if_enabled(bti)
 
         self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
-        self.assertEqual(mock_response_json_data, bti.response)
+        self.assertEqual(bti.response_status_code, 201)
+        self.assertIsNone(bti.response_data)
+        self.assertEqual(bti.attempt_count, 1)
+        self.assertIsNone(bti.next_attempt_at)
 
     @override_settings(
         NAU_FINANCIAL_MANAGER={
@@ -569,7 +584,7 @@ class FinancialManagerNAUExtensionsTests(TestCase):
         }
 
         with mock.patch.object(
-            requests,
+            requests.Session,
             "post",
             return_value=MockResponse(
                 json_data=mock_response_json_data,
@@ -579,7 +594,9 @@ class FinancialManagerNAUExtensionsTests(TestCase):
             send_to_financial_manager_if_enabled(bti)
 
         self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
-        self.assertEqual(mock_response_json_data, bti.response)
+        self.assertEqual(bti.response_status_code, 400)
+        self.assertEqual(bti.response_error_fields, "transaction_id")
+        self.assertIsNone(bti.response_data)
 
     @override_settings(
         NAU_FINANCIAL_MANAGER={
@@ -628,7 +645,7 @@ class FinancialManagerNAUExtensionsTests(TestCase):
         }
 
         with mock.patch.object(
-            requests,
+            requests.Session,
             "post",
             return_value=MockResponse(
                 json_data=mock_response_json_data,
@@ -638,7 +655,12 @@ class FinancialManagerNAUExtensionsTests(TestCase):
             send_to_financial_manager_if_enabled(bti)
 
         self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_ERROR)
-        self.assertEqual(mock_response_json_data, bti.response)
+        self.assertEqual(bti.response_status_code, 400)
+        self.assertEqual(bti.response_error_fields, "other_field")
+        self.assertEqual(mock_response_json_data, bti.response_data)
+        self.assertEqual(bti.attempt_count, 1)
+        self.assertIsNotNone(bti.last_attempt_at)
+        self.assertGreater(bti.next_attempt_at, bti.last_attempt_at)
 
     @override_settings(
         NAU_FINANCIAL_MANAGER={
@@ -648,7 +670,7 @@ class FinancialManagerNAUExtensionsTests(TestCase):
             },
         },
     )
-    @mock.patch.object(requests, "get", return_value=MockResponse(
+    @mock.patch.object(requests.Session, "get", return_value=MockResponse(
         json_data="https://example.com/somereceipt.pdf",
         status_code=200,
     ))
@@ -682,7 +704,7 @@ class FinancialManagerNAUExtensionsTests(TestCase):
         order = create_order(basket=basket)
 
         link = get_receipt_link(order)
-        mock_fm_receipt_link.assert_called_once_with(f"https://finacial-manager.example.com/api/billing/receipt-link/{basket.order_number}/", headers={'Authorization': 'a-very-long-token'}, timeout=10)
+        mock_fm_receipt_link.assert_called_once_with(f"https://finacial-manager.example.com/api/billing/receipt-link/{basket.order_number}/", headers={'Authorization': 'a-very-long-token'}, timeout=(5, 10))
 
         self.assertEqual(link, "https://example.com/somereceipt.pdf")
 
@@ -694,7 +716,7 @@ class FinancialManagerNAUExtensionsTests(TestCase):
             },
         },
     )
-    @mock.patch.object(requests, "get", return_value=MockResponse(
+    @mock.patch.object(requests.Session, "get", return_value=MockResponse(
         status_code=404,
     ))
     def test_get_receipt_link_not_found(self, mock_fm_receipt_link):
@@ -727,6 +749,447 @@ class FinancialManagerNAUExtensionsTests(TestCase):
         order = create_order(basket=basket)
 
         link = get_receipt_link(order)
-        mock_fm_receipt_link.assert_called_once_with(f"https://finacial-manager.example.com/api/billing/receipt-link/{basket.order_number}/", headers={'Authorization': 'a-very-long-token'}, timeout=10)
+        mock_fm_receipt_link.assert_called_once_with(f"https://finacial-manager.example.com/api/billing/receipt-link/{basket.order_number}/", headers={'Authorization': 'a-very-long-token'}, timeout=(5, 10))
 
         self.assertEqual(link, None)
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+                "token": "a-very-long-token",
+                "pool-size": 20,
+                "connect-timeout": 2,
+                "timeout": 15,
+            },
+        },
+    )
+    def test_financial_manager_client_reused(self):
+        """
+        Test that the same pooled client is reused for the same partner and that it uses
+        the partner settings.
+        """
+        partner = PartnerFactory(short_code="edX")
+        site_configuration = SiteConfigurationFactory(partner=partner)
+        site = site_configuration.site
+
+        client = get_financial_manager_client(site)
+        self.assertIs(client, get_financial_manager_client(site))
+        self.assertEqual(client.session.get_adapter(
+            "https://finacial-manager.example.com/")._pool_maxsize, 20)  # pylint: disable=protected-access
+
+        with mock.patch.object(
+            requests.Session,
+            "post",
+            return_value=MockResponse(status_code=201),
+        ) as mock_post:
+            client.send_transaction({"some": "data"})
+        mock_post.assert_called_once_with(
+            "https://finacial-manager.example.com/api/billing/transaction-complete/",
+            data=b'{"some":"data"}',
+            headers={"Authorization": "a-very-long-token", "Content-Type": "application/json"},
+            timeout=(2, 15),
+        )
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    def test_send_to_financial_manager_connection_error(self):
+        """
+        Test that a connection error to the financial manager system is registered as an error
+        and that it is scheduled to be retried later.
+        """
+        partner = PartnerFactory(short_code="edX")
+        site_configuration = SiteConfigurationFactory(partner=partner)
+        site = site_configuration.site
+        basket = create_basket(owner=UserFactory(), site=site)
+        create_order(basket=basket)
+
+        bti = BasketTransactionIntegration.create(basket)
+        bti.save()
+
+        with mock.patch.object(
+            requests.Session,
+            "post",
+            side_effect=requests.exceptions.ConnectionError("Connection refused"),
+        ):
+            send_to_financial_manager_if_enabled(bti)
+
+        self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_ERROR)
+        self.assertIsNone(bti.response_status_code)
+        self.assertIsNone(bti.response_data)
+        self.assertEqual(bti.attempt_count, 1)
+        self.assertIsNotNone(bti.next_attempt_at)
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+                "token": "a-very-long-token",
+            },
+        },
+        NAU_FINANCIAL_MANAGER_RESPONSE_MAX_LENGTH=50,
+        NAU_FINANCIAL_MANAGER_RESPONSE_COMPRESS=True,
+    )
+    def test_send_to_financial_manager_error_response_capped(self):
+        """
+        Test that the body of an error response is capped and compressed.
+        """
+        partner = PartnerFactory(short_code="edX")
+        site_configuration = SiteConfigurationFactory(partner=partner)
+        basket = create_basket(owner=UserFactory(), site=site_configuration.site)
+        create_order(basket=basket)
+
+        bti = BasketTransactionIntegration.create(basket)
+        bti.save()
+
+        with mock.patch.object(
+            requests.Session,
+            "post",
+            return_value=MockResponse(json_data={"detail": "a" * 100}, status_code=500),
+        ):
+            send_to_financial_manager_if_enabled(bti)
+
+        bti.refresh_from_db()
+        self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_ERROR)
+        self.assertEqual(bti.response_status_code, 500)
+        self.assertEqual(bti.response_error_fields, "detail")
+        self.assertEqual(bytes(bti.response_body)[:2], b"\x1f\x8b")
+        self.assertEqual(bti.response_data, '{"detail":"' + "a" * 39)
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    def test_send_to_financial_manager_attempts_logged(self):
+        """
+        Test that each attempt is appended to the attempts log, with its timings, status code
+        and error class.
+        """
+        partner = PartnerFactory(short_code="edX")
+        site_configuration = SiteConfigurationFactory(partner=partner)
+        basket = create_basket(owner=UserFactory(), site=site_configuration.site)
+        create_order(basket=basket)
+
+        bti = BasketTransactionIntegration.create(basket)
+        bti.save()
+
+        with mock.patch.object(
+            requests.Session,
+            "post",
+            side_effect=requests.exceptions.ConnectionError("Connection refused"),
+        ):
+            send_to_financial_manager_if_enabled(bti)
+        with mock.patch.object(
+            requests.Session, "post", return_value=MockResponse(json_data={}, status_code=201)
+        ):
+            send_to_financial_manager_if_enabled(bti, sync_request=False)
+
+        first_attempt, second_attempt = bti.attempts.order_by("id")
+        self.assertEqual(first_attempt.partner, "edx")
+        self.assertEqual(first_attempt.integration_id, bti.id)
+        self.assertIsNotNone(first_attempt.request_build_duration_ms)
+        self.assertIsNotNone(first_attempt.http_duration_ms)
+        self.assertIsNone(first_attempt.status_code)
+        self.assertEqual(first_attempt.error_class, "ConnectionError")
+        self.assertIsNone(second_attempt.request_build_duration_ms)
+        self.assertEqual(second_attempt.status_code, 201)
+        self.assertEqual(second_attempt.error_class, "")
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_SECONDS=60,
+        NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_MAX_SECONDS=3600,
+        NAU_FINANCIAL_MANAGER_RETRY_BACKOFF_JITTER=0,
+    )
+    def test_get_next_attempt_at_exponential_backoff(self):
+        """
+        Test that the retry delay doubles on each attempt until the maximum delay.
+        """
+        def delay(attempt_count):
+            return round((get_next_attempt_at(attempt_count) - timezone.now()).total_seconds())
+
+        self.assertEqual(delay(1), 60)
+        self.assertEqual(delay(2), 120)
+        self.assertEqual(delay(3), 240)
+        self.assertEqual(delay(500), 3600)
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+                "receipt-link-url": "https://finacial-manager.example.com/api/billing/receipt-link/",
+                "token": "a-very-long-token",
+                "circuit-breaker-threshold": 2,
+            },
+        },
+    )
+    def test_send_to_financial_manager_circuit_breaker(self):
+        """
+        Test that after consecutive failures the calls to the financial manager are short-circuited,
+        the transactions are scheduled to be retried later and no receipt link is returned.
+        """
+        partner = PartnerFactory(short_code="edX")
+        site_configuration = SiteConfigurationFactory(partner=partner)
+        site = site_configuration.site
+
+        btis = []
+        orders = []
+        for _ in range(3):
+            basket = create_basket(owner=UserFactory(), site=site)
+            orders.append(create_order(basket=basket))
+            bti = BasketTransactionIntegration.create(basket)
+            bti.save()
+            btis.append(bti)
+
+        with mock.patch.object(
+            requests.Session,
+            "post",
+            return_value=MockResponse(status_code=503),
+        ) as mock_post:
+            self.assertTrue(send_to_financial_manager_if_enabled(btis[0]))
+            self.assertTrue(send_to_financial_manager_if_enabled(btis[1]))
+            self.assertFalse(send_to_financial_manager_if_enabled(btis[2]))
+        self.assertEqual(mock_post.call_count, 2)
+
+        self.assertEqual(btis[2].state, BasketTransactionIntegration.SENT_WITH_ERROR)
+        self.assertEqual(btis[2].attempt_count, 0)
+        self.assertGreater(btis[2].next_attempt_at, timezone.now())
+
+        with mock.patch.object(requests.Session, "get") as mock_get:
+            self.assertIsNone(get_receipt_link(orders[0]))
+        mock_get.assert_not_called()
+
+    def _create_order_for_receipt_link(self):
+        partner = PartnerFactory(short_code="edX")
+        site_configuration = SiteConfigurationFactory(partner=partner)
+        basket = create_basket(owner=UserFactory(), site=site_configuration.site)
+        return create_order(basket=basket)
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "receipt-link-url": "https://finacial-manager.example.com/api/billing/receipt-link/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    def test_get_receipt_link_cached(self):
+        """
+        Test that a found receipt link is cached, so the financial manager is called only once.
+        """
+        order = self._create_order_for_receipt_link()
+        with mock.patch.object(requests.Session, "get", return_value=MockResponse(
+            json_data="https://example.com/somereceipt.pdf",
+            status_code=200,
+        )) as mock_get:
+            self.assertEqual(get_receipt_link(order), "https://example.com/somereceipt.pdf")
+            self.assertEqual(get_receipt_link(order), "https://example.com/somereceipt.pdf")
+        mock_get.assert_called_once()
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "receipt-link-url": "https://finacial-manager.example.com/api/billing/receipt-link/",
+                "token": "a-very-long-token",
+            },
+        },
+        NAU_FINANCIAL_MANAGER_RECEIPT_LINK_MISS_CACHE_TIMEOUT=60,
+    )
+    def test_get_receipt_link_not_found_cached(self):
+        """
+        Test that a missing receipt link is also cached, but that a server error isn't.
+        """
+        order = self._create_order_for_receipt_link()
+        with mock.patch.object(requests.Session, "get", return_value=MockResponse(
+            status_code=500,
+        )) as mock_get:
+            self.assertIsNone(get_receipt_link(order))
+            self.assertIsNone(get_receipt_link(order))
+        self.assertEqual(mock_get.call_count, 2)
+
+        with mock.patch.object(requests.Session, "get", return_value=MockResponse(
+            status_code=404,
+        )) as mock_get:
+            self.assertIsNone(get_receipt_link(order))
+            self.assertIsNone(get_receipt_link(order))
+        mock_get.assert_called_once()
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "receipt-link-url": "https://finacial-manager.example.com/api/billing/receipt-link/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    def test_get_receipt_link_coalesced(self):
+        """
+        Test that while other request is fetching the receipt link, it waits for its result instead
+        of calling the financial manager.
+        """
+        order = self._create_order_for_receipt_link()
+        cache_key = f"nau_extensions.receipt_link.{order.basket.order_number}"
+        cache.add(f"{cache_key}.lock", True)
+
+        def other_request_finished(_interval):
+            cache.set(cache_key, {"receipt_link": "https://example.com/somereceipt.pdf"})
+
+        with mock.patch("nau_extensions.financial_manager.time.sleep", side_effect=other_request_finished), \
+                mock.patch.object(requests.Session, "get") as mock_get:
+            self.assertEqual(get_receipt_link(order), "https://example.com/somereceipt.pdf")
+        mock_get.assert_not_called()
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "receipt-link-url": "https://finacial-manager.example.com/api/billing/receipt-link/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    def test_get_receipt_link_coalesced_failed(self):
+        """
+        Test that a request waiting for other request fetching the same receipt link stops
+        waiting as soon as the other request fails, without caching it.
+        """
+        order = self._create_order_for_receipt_link()
+        cache_key = f"nau_extensions.receipt_link.{order.basket.order_number}"
+        cache.add(f"{cache_key}.lock", True)
+
+        def other_request_failed(_interval):
+            cache.delete(f"{cache_key}.lock")
+
+        with mock.patch(
+            "nau_extensions.financial_manager.time.sleep", side_effect=other_request_failed
+        ) as mock_sleep, mock.patch.object(requests.Session, "get") as mock_get:
+            self.assertIsNone(get_receipt_link(order))
+        mock_sleep.assert_called_once()
+        mock_get.assert_not_called()
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "receipt-link-url": "https://finacial-manager.example.com/api/billing/receipt-link/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    def test_get_receipt_link_saved_on_basket_transaction_integration(self):
+        """
+        Test that the receipt link received from the financial manager is saved on the
+        `BasketTransactionIntegration` and that it's read from there afterwards.
+        """
+        order = self._create_order_for_receipt_link()
+        bti = BasketTransactionIntegration.create(order.basket)
+        bti.state = BasketTransactionIntegration.SENT_WITH_SUCCESS
+        bti.save()
+
+        with mock.patch.object(requests.Session, "get", return_value=MockResponse(
+            json_data=b"https://example.com/somereceipt.pdf",
+            status_code=200,
+        )):
+            self.assertEqual(get_receipt_link(order), "https://example.com/somereceipt.pdf")
+
+        bti.refresh_from_db()
+        self.assertEqual(bti.receipt_link, "https://example.com/somereceipt.pdf")
+        self.assertIsNotNone(bti.receipt_link_fetched_at)
+
+        cache.clear()
+        with mock.patch.object(requests.Session, "get") as mock_get:
+            self.assertEqual(get_receipt_link(order), "https://example.com/somereceipt.pdf")
+        mock_get.assert_not_called()
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    @mock.patch("nau_extensions.financial_manager.prefetch_receipt_link")
+    def test_send_to_financial_manager_prefetch_receipt_link(self, mock_prefetch):
+        """
+        Test that the receipt link is prefetched only after a successful send.
+        """
+        order = self._create_order_for_receipt_link()
+        bti = BasketTransactionIntegration.create(order.basket)
+        bti.save()
+
+        with mock.patch.object(requests.Session, "post", return_value=MockResponse(status_code=500)):
+            send_to_financial_manager_if_enabled(bti)
+        mock_prefetch.assert_not_called()
+
+        with mock.patch.object(requests.Session, "post", return_value=MockResponse(status_code=201)):
+            send_to_financial_manager_if_enabled(bti)
+        mock_prefetch.assert_called_once_with(bti)
+
+    def _create_bti_with_lines(self, course, country, number_of_lines):
+        owner = UserFactory()
+        basket = create_basket(owner=owner, empty=True)
+        for index in range(number_of_lines):
+            basket.add_product(course.create_or_update_seat(f"type-{index}", True, 10 + index))
+        create_order(basket=basket)
+        BasketBillingInformation.objects.create(
+            basket=basket, line1="Av. do Brasil n.º 101", line4="Lisboa", country=country, vatin="123456789",
+        )
+        bti = BasketTransactionIntegration.create(basket)
+        bti.save()
+        return bti
+
+    @override_settings(OSCAR_DEFAULT_CURRENCY="EUR")
+    def test_financial_manager_sync_data_bulk(self):
+        """
+        Test that the bulk synchronization produces the same data as the synchronization of each
+        `BasketTransactionIntegration`, using the same number of queries independently of the
+        number of objects and order lines.
+        """
+        partner = PartnerFactory(short_code="edX")
+        course = CourseFactory(
+            id="course-v1:edX+DemoX+Demo_Course",
+            name="edX Demonstration Course",
+            partner=partner,
+        )
+        country = CountryFactory(iso_3166_1_a2="PT", printable_name="Portugal")
+        btis = [self._create_bti_with_lines(course, country, number_of_lines) for number_of_lines in (1, 3)]
+
+        expected = [sync_request_data(bti) for bti in btis]
+        btis = list(BasketTransactionIntegration.objects.filter(id__in=[bti.id for bti in btis]).order_by("id"))
+        self.assertEqual(sync_request_data_bulk(btis), expected)
+        self.assertEqual([bti.request for bti in btis], expected)
+
+        with CaptureQueriesContext(connection) as single_queries:
+            sync_request_data_bulk(BasketTransactionIntegration.objects.filter(id=btis[0].id))
+        with CaptureQueriesContext(connection) as multiple_queries:
+            sync_request_data_bulk(BasketTransactionIntegration.objects.all())
+        self.assertEqual(len(single_queries), len(multiple_queries))
+
+    @override_settings(OSCAR_DEFAULT_CURRENCY="EUR")
+    def test_financial_manager_sync_data_unchanged_not_saved(self):
+        """
+        Test that the request data is only saved when it has changed.
+        """
+        order = self._create_order_for_receipt_link()
+        bti = BasketTransactionIntegration.create(order.basket)
+        bti.save()
+
+        sync_request_data(bti)
+        bti = BasketTransactionIntegration.objects.get(id=bti.id)
+        self.assertNotEqual(bti.request_hash, "")
+
+        with CaptureQueriesContext(connection) as queries:
+            sync_request_data(bti)
+        self.assertFalse([query for query in queries if query["sql"].startswith("UPDATE")])
+
+        with CaptureQueriesContext(connection) as queries:
+            sync_request_data_bulk([bti])
+        self.assertFalse([query for query in queries if query["sql"].startswith("UPDATE")])
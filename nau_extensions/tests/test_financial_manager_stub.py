@@ -0,0 +1,106 @@
+import requests
+from django.core.cache import cache
+from nau_extensions.financial_manager import (
+    FinancialManagerClient, fetch_receipt_link,
+    send_to_financial_manager_if_enabled)
+from nau_extensions.financial_manager_stub import FinancialManagerStubServer
+from nau_extensions.models import BasketTransactionIntegration
+from nau_extensions.tests.factories import create_basket
+
+from ecommerce.extensions.test.factories import create_order
+from ecommerce.tests.factories import (PartnerFactory,
+                                       SiteConfigurationFactory, UserFactory)
+from ecommerce.tests.testcases import TestCase
+
+
+class FinancialManagerStubNAUExtensionsTests(TestCase):
+    """
+    Test the real financial manager client path against the stand-in server.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # the circuit breaker state is kept on the cache
+        cache.clear()
+
+    def _settings(self, server):
+        return self.settings(
+            NAU_FINANCIAL_MANAGER={
+                "edx": {
+                    "url": server.transaction_url,
+                    "receipt-link-url": server.receipt_link_url,
+                    "token": "a-very-long-token",
+                },
+            },
+            NAU_FINANCIAL_MANAGER_RECEIPT_LINK_PREFETCH=False,
+        )
+
+    def _create_basket_transaction_integration(self):
+        partner = PartnerFactory(short_code="edX")
+        site = SiteConfigurationFactory(partner=partner).site
+        basket = create_basket(owner=UserFactory(), site=site)
+        create_order(basket=basket)
+        bti = BasketTransactionIntegration.create(basket)
+        bti.save()
+        return bti
+
+    def test_send_and_receipt_link(self):
+        """
+        Test sending a transaction, a duplicate of it and getting its receipt link.
+        """
+        bti = self._create_basket_transaction_integration()
+        with FinancialManagerStubServer(token="a-very-long-token") as server, self._settings(server):
+            self.assertTrue(send_to_financial_manager_if_enabled(bti))
+            self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
+            self.assertEqual(bti.response_transaction_id, bti.basket.order_number)
+
+            # the duplicate transaction is also considered a success
+            self.assertTrue(send_to_financial_manager_if_enabled(bti, sync_request=False))
+            self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
+            self.assertEqual(bti.response_status_code, 400)
+            self.assertEqual(bti.response_error_fields, "transaction_id")
+
+            self.assertEqual(
+                fetch_receipt_link(bti.basket.site, bti.basket.order_number),
+                f"{server.url}/receipts/{bti.basket.order_number}.pdf",
+            )
+            self.assertIsNone(fetch_receipt_link(bti.basket.site, "unknown"))
+        self.assertEqual(server.request_count, 4)
+
+    def test_send_injected_error(self):
+        """
+        Test that an injected error is registered as an error.
+        """
+        bti = self._create_basket_transaction_integration()
+        with FinancialManagerStubServer(error_rate=1) as server, self._settings(server):
+            send_to_financial_manager_if_enabled(bti)
+        self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_ERROR)
+        self.assertEqual(bti.response_data, {"detail": "Injected error."})
+        self.assertIsNotNone(bti.next_attempt_at)
+
+    def test_timeout(self):
+        """
+        Test that an injected timeout reaches the timeout of the client.
+        """
+        with FinancialManagerStubServer(timeout_rate=1, timeout_seconds=1) as server:
+            with self.settings(
+                NAU_FINANCIAL_MANAGER={
+                    "edx": {"url": server.transaction_url, "token": "token", "timeout": 0.1},
+                },
+            ):
+                client = FinancialManagerClient("edx")
+                with self.assertRaises(requests.exceptions.ReadTimeout):
+                    client.send_transaction({"transaction_id": "EDX-1"})
+                client.close()
+
+    def test_latency(self):
+        """
+        Test the latency distributions.
+        """
+        for distribution in ("constant", "uniform", "exponential"):
+            server = FinancialManagerStubServer(
+                latency_distribution=distribution, latency_mean=0.1, seed=1
+            )
+            latencies = [server._next_fault()[0] for _ in range(1000)]  # pylint: disable=protected-access
+            server.stop()
+            self.assertAlmostEqual(sum(latencies) / len(latencies), 0.1, delta=0.02)
@@ -0,0 +1,139 @@
+import mock
+import requests
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, override_settings
+from nau_extensions import metrics
+from nau_extensions.financial_manager import FinancialManagerClient
+from nau_extensions.metrics import MetricsRegistry
+from nau_extensions.tests.factories import MockResponse
+from nau_extensions.views import MetricsView
+
+from ecommerce.tests.factories import UserFactory
+from ecommerce.tests.testcases import TestCase
+
+
+class MetricsRegistryNAUExtensionsTests(TestCase):
+    """
+    Test the in-process metrics registry.
+    """
+
+    def test_render_counter(self):
+        """
+        Test the rendering of a counter on the Prometheus text format.
+        """
+        registry = MetricsRegistry()
+        registry.increment("calls_total", {"partner": "edx", "status": 201})
+        registry.increment("calls_total", {"status": 201, "partner": "edx"}, 2)
+        registry.increment("calls_total", {"partner": 'a"b', "status": 500})
+        self.assertEqual(
+            registry.render(),
+            "# TYPE calls_total counter\n"
+            'calls_total{partner="a\\"b",status="500"} 1\n'
+            'calls_total{partner="edx",status="201"} 3\n',
+        )
+
+    def test_render_histogram(self):
+        """
+        Test the rendering of a histogram on the Prometheus text format.
+        """
+        registry = MetricsRegistry(buckets=(0.1, 1))
+        registry.observe("duration_seconds", 0.05, {"partner": "edx"})
+        registry.observe("duration_seconds", 0.5, {"partner": "edx"})
+        registry.observe("duration_seconds", 2, {"partner": "edx"})
+        self.assertEqual(
+            registry.render(),
+            "# TYPE duration_seconds histogram\n"
+            'duration_seconds_bucket{partner="edx",le="0.1"} 1\n'
+            'duration_seconds_bucket{partner="edx",le="1"} 2\n'
+            'duration_seconds_bucket{partner="edx",le="+Inf"} 3\n'
+            'duration_seconds_sum{partner="edx"} 2.55\n'
+            'duration_seconds_count{partner="edx"} 3\n',
+        )
+
+    def test_backend_error_ignored(self):
+        """
+        Test that an error of the metrics backend doesn't break the caller.
+        """
+        with mock.patch.object(MetricsRegistry, "increment", side_effect=ValueError):
+            metrics.increment("calls_total", partner="edx")
+
+
+@override_settings(
+    NAU_FINANCIAL_MANAGER={
+        "edx": {
+            "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+            "token": "a-very-long-token",
+        },
+    },
+)
+class FinancialManagerMetricsNAUExtensionsTests(TestCase):
+    """
+    Test the metrics recorded by the financial manager client.
+    """
+
+    def setUp(self):
+        super().setUp()
+        metrics.get_metrics_backend().reset()
+
+    @mock.patch.object(requests.Session, "post", return_value=MockResponse(json_data={}, status_code=201))
+    def test_send_transaction_metrics(self, _mock_post):
+        """
+        Test that the number of calls and their latency are recorded.
+        """
+        FinancialManagerClient("edx").send_transaction({})
+        rendered = metrics.get_metrics_backend().render()
+        self.assertIn(
+            'nau_financial_manager_requests_total{operation="send",partner="edx",status="201"} 1',
+            rendered,
+        )
+        self.assertIn(
+            'nau_financial_manager_request_duration_seconds_count{operation="send",partner="edx"} 1',
+            rendered,
+        )
+
+    @mock.patch.object(requests.Session, "post", side_effect=requests.exceptions.ConnectionError)
+    def test_send_transaction_error_metrics(self, _mock_post):
+        """
+        Test that the connection errors are recorded.
+        """
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            FinancialManagerClient("edx").send_transaction({})
+        self.assertIn(
+            'nau_financial_manager_requests_total{operation="send",partner="edx",status="error"} 1',
+            metrics.get_metrics_backend().render(),
+        )
+
+
+class MetricsViewNAUExtensionsTests(TestCase):
+    """
+    Test the view that exposes the metrics.
+    """
+
+    def _get(self, user=None, **headers):
+        request = RequestFactory().get("/", **headers)
+        request.user = user or AnonymousUser()
+        return MetricsView.as_view()(request)
+
+    def test_staff(self):
+        """
+        Test that the metrics are available to the staff users.
+        """
+        metrics.increment("calls_total", partner="edx")
+        response = self._get(user=UserFactory(is_staff=True))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'calls_total{partner="edx"}', response.content)
+
+    def test_not_staff(self):
+        """
+        Test that the metrics aren't available to the other users.
+        """
+        self.assertEqual(self._get().status_code, 403)
+        self.assertEqual(self._get(user=UserFactory()).status_code, 403)
+
+    @override_settings(NAU_METRICS_TOKEN="a-metrics-token")
+    def test_token(self):
+        """
+        Test the authorization with the bearer token.
+        """
+        self.assertEqual(self._get(HTTP_AUTHORIZATION="Bearer a-metrics-token").status_code, 200)
+        self.assertEqual(self._get(HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
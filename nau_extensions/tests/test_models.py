@@ -1,4 +1,8 @@
-from nau_extensions.models import BasketTransactionIntegration
+from datetime import timedelta
+
+from django.utils import timezone
+from nau_extensions.models import (BasketTransactionIntegration,
+                                   BasketTransactionIntegrationAttempt)
 
 from ecommerce.extensions.test.factories import create_order
 from ecommerce.tests.factories import UserFactory
@@ -24,3 +28,51 @@ class ModelsNAUExtensionsTests(TestCase):
 
         self.assertNotEqual(bti.id, None)
         self.assertEqual(bti.id, bti2.id)
+
+    def test_basket_transaction_integration_attempt_latency_percentiles(self):
+        """
+        Test the latency percentiles of the attempts of each partner.
+        """
+        bti = BasketTransactionIntegration.create(create_order(user=UserFactory()).basket)
+        bti.save()
+        for http_duration_ms in range(1, 101):
+            BasketTransactionIntegrationAttempt.objects.create(
+                basket_transaction_integration=bti,
+                partner="edx",
+                request_build_duration_ms=5 if http_duration_ms == 1 else None,
+                http_duration_ms=http_duration_ms,
+                status_code=201,
+            )
+        BasketTransactionIntegrationAttempt.objects.create(
+            basket_transaction_integration=bti,
+            partner="other",
+            error_class="ConnectionError",
+        )
+
+        percentiles = BasketTransactionIntegrationAttempt.get_latency_percentiles(
+            timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(
+            percentiles,
+            [
+                {
+                    "partner": "edx",
+                    "count": 100,
+                    "request_build_duration_ms": [5, 5, 5],
+                    "http_duration_ms": [50, 95, 99],
+                },
+                {
+                    "partner": "other",
+                    "count": 1,
+                    "request_build_duration_ms": [None, None, None],
+                    "http_duration_ms": [None, None, None],
+                },
+            ],
+        )
+        self.assertEqual(
+            BasketTransactionIntegrationAttempt.get_latency_percentiles(
+                timezone.now() + timedelta(hours=1)
+            ),
+            [],
+        )
@@ -0,0 +1,148 @@
+import mock
+import requests
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from nau_extensions.financial_manager import (_convert_order_lines,
+                                              sync_request_data)
+from nau_extensions.models import (BasketBillingInformation,
+                                   BasketTransactionIntegration)
+from nau_extensions.tests.factories import (MockResponse, create_basket,
+                                            create_order_with_lines)
+from nau_extensions.views import (
+    BasketBillingInformationAddressCreateUpdateView,
+    BasketBillingInformationVATINCreateUpdateView, ReceiptLinkView)
+from oscar.core.loading import get_model
+from oscar.test.factories import CountryFactory
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.tests.factories import (PartnerFactory,
+                                       SiteConfigurationFactory, UserFactory)
+from ecommerce.tests.testcases import TestCase
+
+Order = get_model("order", "Order")
+
+NUMBER_OF_LINES = (1, 10, 100)
+
+# the first run warms up the caches that are shared between runs, e.g. the content types
+WARM_UP_AND_NUMBER_OF_LINES = (None, ) + NUMBER_OF_LINES
+
+
+class QueryCountsNAUExtensionsTests(TestCase):
+    """
+    Guard the hot paths against N+1 queries, the number of queries of each path shouldn't
+    grow with the number of order lines.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.partner = PartnerFactory(short_code="edX")
+        self.site = SiteConfigurationFactory(partner=self.partner).site
+        self.course = CourseFactory(
+            id="course-v1:edX+DemoX+Demo_Course",
+            name="edX Demonstration Course",
+            partner=self.partner,
+        )
+        self.country = CountryFactory(iso_3166_1_a2="PT", printable_name="Portugal")
+
+    def _create_order(self, number_of_lines, owner=None):
+        order = create_order_with_lines(
+            number_of_lines or 1, owner=owner or UserFactory(), site=self.site, course=self.course
+        )
+        BasketBillingInformation.objects.create(
+            basket=order.basket,
+            first_name="Fundação",
+            line1="Av. do Brasil n.º 101",
+            line4="Lisboa",
+            country=self.country,
+            vatin="123456789",
+        )
+        return order
+
+    def _count_queries(self, function, *args):
+        with CaptureQueriesContext(connection) as queries:
+            function(*args)
+        return len(queries)
+
+    def assertConstantQueries(self, counts):
+        """
+        Assert that the number of queries is the same for every number of lines.
+        """
+        counts.pop(None)
+        self.assertEqual(
+            len(set(counts.values())), 1, f"Number of queries by number of lines: {counts}"
+        )
+
+    def test_sync_request_data_query_count(self):
+        """
+        Test that `sync_request_data` uses a fixed number of queries.
+        """
+        counts = {}
+        for number_of_lines in WARM_UP_AND_NUMBER_OF_LINES:
+            order = self._create_order(number_of_lines)
+            bti = BasketTransactionIntegration.create(order.basket)
+            bti.save()
+            bti = BasketTransactionIntegration.objects.get(id=bti.id)
+            counts[number_of_lines] = self._count_queries(sync_request_data, bti)
+            self.assertEqual(len(bti.request["items"]), number_of_lines or 1)
+        self.assertConstantQueries(counts)
+
+    def test_convert_order_lines_query_count(self):
+        """
+        Test that `_convert_order_lines` uses a fixed number of queries.
+        """
+        counts = {}
+        for number_of_lines in WARM_UP_AND_NUMBER_OF_LINES:
+            order = Order.objects.get(id=self._create_order(number_of_lines).id)
+            counts[number_of_lines] = self._count_queries(_convert_order_lines, order)
+        self.assertConstantQueries(counts)
+
+    def test_billing_views_get_initial_query_count(self):
+        """
+        Test that the `get_initial` of the billing information views uses a fixed number of queries.
+        """
+        for view_class in (
+            BasketBillingInformationAddressCreateUpdateView,
+            BasketBillingInformationVATINCreateUpdateView,
+        ):
+            counts = {}
+            for number_of_lines in WARM_UP_AND_NUMBER_OF_LINES:
+                owner = UserFactory()
+                # a previous basket with billing information of the same owner
+                self._create_order(number_of_lines, owner=owner)
+                view = view_class()
+                view.request = RequestFactory().get("/")
+                view.kwargs = {}
+                view.basket = create_basket(owner=owner, site=self.site)
+                counts[number_of_lines] = self._count_queries(view.get_initial)
+            self.assertConstantQueries(counts)
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "receipt-link-url": "https://finacial-manager.example.com/api/billing/receipt-link/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    @mock.patch.object(requests.Session, "get", return_value=MockResponse(
+        json_data="https://example.com/somereceipt.pdf",
+        status_code=200,
+    ))
+    def test_receipt_link_view_query_count(self, _mock_get):
+        """
+        Test that the `ReceiptLinkView` uses a fixed number of queries.
+        """
+        counts = {}
+        for number_of_lines in WARM_UP_AND_NUMBER_OF_LINES:
+            order = self._create_order(number_of_lines)
+            bti = BasketTransactionIntegration.create(order.basket)
+            bti.state = BasketTransactionIntegration.SENT_WITH_SUCCESS
+            bti.save()
+            request = APIRequestFactory().get("/", {"order_id": order.id})
+            force_authenticate(request, user=order.user)
+            counts[number_of_lines] = self._count_queries(ReceiptLinkView.as_view(), request)
+        self.assertConstantQueries(counts)
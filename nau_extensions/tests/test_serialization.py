@@ -0,0 +1,127 @@
+import gzip
+import json
+from decimal import Decimal
+
+import mock
+import requests
+from django.test import override_settings
+from nau_extensions.financial_manager import (
+    FinancialManagerClient, get_request_hash,
+    send_to_financial_manager_if_enabled, sync_request_data)
+from nau_extensions.models import BasketTransactionIntegration
+from nau_extensions.serialization import compress, decode_body, encode_json
+from nau_extensions.tests.factories import MockResponse, create_basket
+
+from ecommerce.extensions.test.factories import create_order
+from ecommerce.tests.factories import (PartnerFactory,
+                                       SiteConfigurationFactory, UserFactory)
+from ecommerce.tests.testcases import TestCase
+
+
+class SerializationNAUExtensionsTests(TestCase):
+    """
+    Test the JSON serialization of the data sent to the nau-financial-manager.
+    """
+
+    def test_encode_json(self):
+        """
+        Test that the data is encoded as compact UTF-8 JSON with the keys sorted and
+        the decimals as exact numbers.
+        """
+        self.assertEqual(
+            encode_json({"b": Decimal("10.00"), "a": [{"d": "Fundação", "c": 1}]}),
+            '{"a":[{"c":1,"d":"Fundação"}],"b":10.00}'.encode("utf-8"),
+        )
+
+    def test_request_hash_equal_after_saving(self):
+        """
+        Test that the hash of the built data is the same of the data loaded from the database,
+        where the decimals have been saved as numbers.
+        """
+        bti = BasketTransactionIntegration.create(create_basket())
+        bti.request = {"total_amount_include_vat": Decimal("24.60"), "currency": "EUR"}
+        bti.save()
+
+        bti.refresh_from_db()
+        self.assertEqual(bti.request, {"total_amount_include_vat": Decimal("24.60"), "currency": "EUR"})
+        self.assertEqual(
+            get_request_hash(bti.request),
+            get_request_hash({"total_amount_include_vat": Decimal("24.60"), "currency": "EUR"}),
+        )
+
+    def test_compress(self):
+        """
+        Test the gzip compression of a body.
+        """
+        body = encode_json({"items": ["item"] * 100})
+        self.assertEqual(gzip.decompress(compress(body)), body)
+
+    def test_decode_body(self):
+        """
+        Test the decoding of the kept bodies, compressed or not, and truncated.
+        """
+        body = encode_json({"detail": "Fundação"})
+        self.assertEqual(decode_body(body), {"detail": "Fundação"})
+        self.assertEqual(decode_body(memoryview(compress(body))), {"detail": "Fundação"})
+        self.assertEqual(decode_body(body[:12]), '{"detail":"F')
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+                "token": "a-very-long-token",
+                "gzip-min-size": 100,
+            },
+        },
+    )
+    def test_send_transaction_gzip(self):
+        """
+        Test that only the transactions with at least `gzip-min-size` bytes are compressed.
+        """
+        client = FinancialManagerClient("edx")
+        with mock.patch.object(
+            requests.Session, "post", return_value=MockResponse(status_code=201)
+        ) as mock_post:
+            client.send_transaction({"some": "data"})
+            client.send_transaction({"items": ["item"] * 100})
+
+        small, large = mock_post.call_args_list
+        self.assertEqual(small.kwargs["data"], b'{"some":"data"}')
+        self.assertNotIn("Content-Encoding", small.kwargs["headers"])
+        self.assertEqual(large.kwargs["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(large.kwargs["data"])), {"items": ["item"] * 100})
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    def test_send_transaction_amounts_as_numbers(self):
+        """
+        Test that the amounts are sent as JSON numbers, also when the request data has been
+        loaded from the database.
+        """
+        partner = PartnerFactory(short_code="edX")
+        site = SiteConfigurationFactory(partner=partner).site
+        basket = create_basket(owner=UserFactory(), site=site)
+        create_order(basket=basket)
+        bti = BasketTransactionIntegration.create(basket)
+        sync_request_data(bti)
+        built_body = encode_json(bti.request)
+
+        bti = BasketTransactionIntegration.objects.get(id=bti.id)
+        with mock.patch.object(
+            requests.Session, "post", return_value=MockResponse(json_data={}, status_code=201)
+        ) as mock_post:
+            send_to_financial_manager_if_enabled(bti, sync_request=False)
+
+        body = mock_post.call_args.kwargs["data"]
+        self.assertEqual(body, built_body)
+        sent = json.loads(body)
+        self.assertEqual(sent["total_amount_include_vat"], 10.0)
+        self.assertEqual(sent["total_discount_incl_tax"], 0.0)
+        self.assertEqual(sent["items"][0]["unit_price_incl_vat"], 10.0)
+        self.assertIn(b'"total_amount_include_vat":10.00', body)
@@ -1,10 +1,17 @@
+import mock
+import requests
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from nau_extensions.models import BasketTransactionIntegration
+from nau_extensions.tests.factories import MockResponse, create_basket
 from oscar.core.loading import get_model
 
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
 from ecommerce.extensions.test.factories import create_order
-from ecommerce.tests.factories import PartnerFactory, UserFactory
+from ecommerce.tests.factories import (PartnerFactory,
+                                       SiteConfigurationFactory, UserFactory)
 from ecommerce.tests.testcases import TestCase
 
 Product = get_model('catalogue', 'Product')
@@ -25,6 +32,53 @@ class SignalsNAUExtensionsTests(TestCase):
         bti = BasketTransactionIntegration.get_by_basket(order.basket)
         self.assertTrue(bti is not None)
 
+    @override_settings(NAU_FINANCIAL_MANAGER_OUTBOX=True)
+    @mock.patch("nau_extensions.signals.send_to_financial_manager_if_enabled")
+    def test_signal_receiver_outbox_only_persists(self, send_mock):
+        """
+        Test that on outbox mode the checkout only persists the `BasketTransactionIntegration`
+        without sending it to the financial manager.
+        """
+        order = create_order(user=UserFactory())
+        EdxOrderPlacementMixin().handle_successful_order(order)
+        bti = BasketTransactionIntegration.get_by_basket(order.basket)
+        self.assertTrue(bti is not None)
+        self.assertEqual(bti.state, BasketTransactionIntegration.TO_BE_SENT)
+        send_mock.assert_not_called()
+
+    @override_settings(
+        NAU_FINANCIAL_MANAGER={
+            "edx": {
+                "url": "https://finacial-manager.example.com/api/billing/transaction-complete/",
+                "token": "a-very-long-token",
+            },
+        },
+    )
+    def test_signal_receiver_single_insert_and_update(self):
+        """
+        Test that the checkout saves the `BasketTransactionIntegration` with a single insert and
+        a single update.
+        """
+        partner = PartnerFactory(short_code="edX")
+        site = SiteConfigurationFactory(partner=partner).site
+        basket = create_basket(owner=UserFactory(), site=site)
+        order = create_order(basket=basket, user=basket.owner)
+
+        with mock.patch.object(requests.Session, "post", return_value=MockResponse(status_code=201)), \
+                CaptureQueriesContext(connection) as queries:
+            EdxOrderPlacementMixin().handle_successful_order(order)
+
+        bti_writes = [
+            query["sql"].split(" ")[0] for query in queries
+            if "nau_extensions_baskettransactionintegration" in query["sql"]
+            and "nau_extensions_baskettransactionintegrationattempt" not in query["sql"]
+            and query["sql"].startswith(("INSERT", "UPDATE"))
+        ]
+        self.assertEqual(bti_writes, ["INSERT", "UPDATE"])
+        bti = BasketTransactionIntegration.get_by_basket(basket)
+        self.assertEqual(bti.state, BasketTransactionIntegration.SENT_WITH_SUCCESS)
+        self.assertEqual(bti.request["transaction_id"], basket.order_number)
+
     def test_change_product_title_verified(self):
         """
         Test change the product hardcoded names in english to portuguese versions for verified course run.
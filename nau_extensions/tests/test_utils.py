@@ -0,0 +1,59 @@
+from django.db import connections
+from nau_extensions.utils import (DatabaseThreadPoolExecutor,
+                                  get_course_org_and_code,
+                                  get_course_org_and_code_cache_stats)
+from opaque_keys import InvalidKeyError
+
+from ecommerce.tests.testcases import TestCase
+
+
+class UtilsNAUExtensionsTests(TestCase):
+    """
+    Test the utility functions of the nau extensions project.
+    """
+
+    def setUp(self):
+        super().setUp()
+        get_course_org_and_code.cache_clear()
+
+    def test_get_course_org_and_code(self):
+        """
+        Test the organization and course code of the different course id formats.
+        """
+        self.assertEqual(get_course_org_and_code("course-v1:edX+DemoX+Demo_Course"), ("edX", "DemoX"))
+        self.assertEqual(get_course_org_and_code("edX/DemoX/Demo_Course"), ("edX", "DemoX"))
+
+    def test_get_course_org_and_code_cached(self):
+        """
+        Test that the same course id is parsed only once.
+        """
+        for _ in range(4):
+            get_course_org_and_code("course-v1:edX+DemoX+Demo_Course")
+        stats = get_course_org_and_code_cache_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["hit_rate"], 0.75)
+        self.assertEqual(stats["size"], 1)
+
+    def test_get_course_org_and_code_invalid(self):
+        """
+        Test that an invalid course id raises an error.
+        """
+        with self.assertRaises(InvalidKeyError):
+            get_course_org_and_code("invalid")
+
+    def test_database_thread_pool_executor(self):
+        """
+        Test that a worker thread reuses its database connection between the tasks, and that
+        it's closed when the pool is shut down.
+        """
+        def task():
+            wrapper = connections["default"]
+            wrapper.ensure_connection()
+            return wrapper, wrapper.connection
+
+        with DatabaseThreadPoolExecutor(max_workers=1) as executor:
+            (wrapper, first), (_, second) = executor.map(lambda _: task(), range(2))
+        self.assertIsNot(wrapper, connections["default"])
+        self.assertIs(first, second)
+        self.assertIsNone(wrapper.connection)
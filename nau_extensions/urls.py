@@ -1,7 +1,8 @@
 from django.conf.urls import url
 from nau_extensions.views import (
     BasketBillingInformationAddressCreateUpdateView,
-    BasketBillingInformationVATINCreateUpdateView, ReceiptLinkView)
+    BasketBillingInformationVATINCreateUpdateView, MetricsView,
+    ReceiptLinkView)
 
 app_name = "ecommerce_nau_extensions"
 
@@ -24,4 +25,10 @@ urlpatterns = [
         name="receipt_link_view",
     ),
 
+    url(
+        r"metrics/$",
+        MetricsView.as_view(),
+        name="metrics_view",
+    ),
+
 ]
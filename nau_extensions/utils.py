@@ -1,4 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from threading import Lock
+
 from django.conf import settings
+from django.db import connections
+from opaque_keys.edx.keys import CourseKey
 from oscar.core.loading import get_model
 
 Order = get_model("order", "Order")
@@ -18,3 +24,67 @@ def get_default_country():
     """
     iso_3166_1_a2 = getattr(settings, 'NAU_DEFAULT_COUNTRY_ISO_3166_1_A2', 'PT')
     return Country.objects.filter(iso_3166_1_a2=iso_3166_1_a2).first()
+
+
+@lru_cache(maxsize=1024)
+def get_course_org_and_code(course_id):
+    """
+    Get the organization and the course code of a course id, e.g. `("edX", "DemoX")` for
+    `course-v1:edX+DemoX+Demo_Course`.
+    The parsed course ids are kept on a bounded LRU cache, because the same few course ids are
+    parsed again and again.
+    """
+    course_key = CourseKey.from_string(course_id)
+    return course_key.org, course_key.course
+
+
+def get_course_org_and_code_cache_stats():
+    """
+    Get the usage statistics of the `get_course_org_and_code` cache.
+    """
+    info = get_course_org_and_code.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+    }
+
+
+class DatabaseThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    Thread pool whose worker threads reuse their own database connections between the tasks,
+    and close them once when the pool is shut down.
+    """
+
+    def __init__(self, max_workers=None, thread_name_prefix=""):
+        self._connections = []
+        self._connections_lock = Lock()
+        super().__init__(
+            max_workers=max_workers,
+            thread_name_prefix=thread_name_prefix,
+            initializer=self._register_connections,
+        )
+
+    def _register_connections(self):
+        """
+        Keep the database connections of each new worker thread, so they can be closed later.
+        """
+        with self._connections_lock:
+            self._connections.extend(connections.all())
+
+    def shutdown(self, wait=True, **kwargs):
+        super().shutdown(wait=wait, **kwargs)
+        if not wait:
+            return
+        # the worker threads have exited, so their connections aren't used anymore
+        with self._connections_lock:
+            worker_connections, self._connections = self._connections, []
+        for worker_connection in worker_connections:
+            worker_connection.inc_thread_sharing()
+            try:
+                worker_connection.close()
+            finally:
+                worker_connection.dec_thread_sharing()
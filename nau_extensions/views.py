@@ -1,16 +1,19 @@
 """
 Basket billing information views.
 """
+import hmac
 import logging
 from abc import abstractmethod
 
 from django import shortcuts
+from django.conf import settings
 from django.contrib import messages
 from django.db import transaction
 from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext_lazy as _
 from django.views import generic
+from nau_extensions import metrics
 from nau_extensions.forms import (BasketBillingInformationAddressForm,
                                   BasketBillingInformationVATINForm)
 from nau_extensions.models import BasketBillingInformation
@@ -223,3 +226,26 @@ class ReceiptLinkView(APIView):
             logging.info("For Order id=[%s] returning receipt_link=[%s]", order_id, receipt_link)
             return HttpResponse(receipt_link if receipt_link else '')
         raise Http404("No id parameter found")
+
+
+class MetricsView(generic.View):
+    """
+    GET /payment/nau_extensions/metrics
+    The metrics of the integration with the financial manager on the Prometheus text format.
+    Authorized by the `NAU_METRICS_TOKEN` bearer token, otherwise only available to staff users.
+    """
+
+    def get(self, request):
+        token = getattr(settings, "NAU_METRICS_TOKEN", None)
+        if token:
+            authorized = hmac.compare_digest(
+                request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}"
+            )
+        else:
+            authorized = request.user.is_authenticated and request.user.is_staff
+        if not authorized:
+            return HttpResponseForbidden("You need to be authorized to see the metrics")
+        backend = metrics.get_metrics_backend()
+        if not hasattr(backend, "render"):
+            raise Http404("The metrics backend can't be rendered")
+        return HttpResponse(backend.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
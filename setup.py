@@ -35,6 +35,7 @@ setup(
     ],
     install_requires=[
         'Django~=3.2',
+        'simplejson',
     ],
     packages=[
         'nau_extensions',